@@ -0,0 +1,128 @@
+"""
+Knights and knaves solver benchmark
+
+Generates random puzzles for each number of inhabitants and asks every
+backend which symbols each puzzle's knowledge entails, timing each
+puzzle. Backends must agree; any disagreement is reported.
+
+Usage: python benchmark.py [options]
+Backends: model_check, sat, knowledge_base
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import sat
+from generator import generate
+from logic import KnowledgeBase, model_check
+
+
+def solve_model_check(puzzle):
+    return [model_check(puzzle.knowledge, symbol)
+            for symbol in puzzle.symbols()]
+
+
+def solve_sat(puzzle):
+    return [sat.entails(puzzle.knowledge, symbol)
+            for symbol in puzzle.symbols()]
+
+
+def solve_knowledge_base(puzzle):
+    return KnowledgeBase(puzzle.knowledge).entails_all(puzzle.symbols())
+
+
+BACKENDS = {
+    "model_check": solve_model_check,
+    "sat": solve_sat,
+    "knowledge_base": solve_knowledge_base
+}
+
+
+def summarize(times):
+    """Returns the mean, p50, p90 and max of a list of seconds, in ms."""
+    times = sorted(times)
+    return {
+        "mean_ms": 1000 * sum(times) / len(times),
+        "p50_ms": 1000 * times[len(times) // 2],
+        "p90_ms": 1000 * times[min(len(times) - 1, int(0.9 * len(times)))],
+        "max_ms": 1000 * times[-1]
+    }
+
+
+def run(sizes, count, backends, depth, unique, seed):
+    """
+    Solves `count` puzzles of each size with every backend. Returns a
+    list of result rows and the number of puzzles where backends
+    disagreed.
+    """
+    rows = []
+    disagreements = 0
+    for people in sizes:
+        times = {backend: [] for backend in backends}
+        for i in range(count):
+            puzzle = generate(people, depth=depth, unique=unique,
+                              seed=f"{seed}:{people}:{i}")
+            answers = []
+            for backend in backends:
+                start = time.perf_counter()
+                answers.append(BACKENDS[backend](puzzle))
+                times[backend].append(time.perf_counter() - start)
+            # An entailed symbol must hold in the planted solution
+            planted = [puzzle.solution[symbol.name]
+                       for symbol in puzzle.symbols()]
+            if any(answer != answers[0] for answer in answers) or any(
+                entailed and not holds
+                for entailed, holds in zip(answers[0], planted)
+            ):
+                disagreements += 1
+                print(f"Wrong or disagreeing answers: {puzzle.describe()}",
+                      file=sys.stderr)
+        for backend in backends:
+            rows.append({"people": people, "symbols": 2 * people,
+                         "backend": backend, "puzzles": count,
+                         **summarize(times[backend])})
+    return rows, disagreements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--count", type=int, default=100,
+                        help="puzzles per size")
+    parser.add_argument("--sizes", default="2,3,4,6,8,12,16",
+                        help="comma-separated numbers of inhabitants")
+    parser.add_argument("-b", "--backends", default=",".join(BACKENDS),
+                        help="comma-separated backends to compare")
+    parser.add_argument("-d", "--depth", type=int, default=2,
+                        help="how deeply claims nest")
+    parser.add_argument("-u", "--unique", action="store_true",
+                        help="add claims until each puzzle has one solution")
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true",
+                        help="print rows as JSON instead of a table")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    backends = args.backends.split(",")
+    for backend in backends:
+        if backend not in BACKENDS:
+            parser.error(f"unknown backend {backend}")
+
+    rows, disagreements = run(sizes, args.count, backends, args.depth,
+                              args.unique, args.seed)
+    if args.json:
+        json.dump(rows, sys.stdout, indent=2)
+        print()
+    else:
+        print("people  backend          mean ms   p50 ms   p90 ms   max ms")
+        for row in rows:
+            print(f"{row['people']:6}  {row['backend']:15}"
+                  f"{row['mean_ms']:9.2f}{row['p50_ms']:9.2f}"
+                  f"{row['p90_ms']:9.2f}{row['max_ms']:9.2f}")
+    if disagreements:
+        sys.exit(f"{disagreements} puzzles with disagreeing backends")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Random knights and knaves puzzles
+
+Every inhabitant is either a knight, who only tells the truth, or a
+knave, who only lies. Each claim is a random sentence about who is
+what, possibly nested ("A says that B says that C is a knave"). A
+puzzle's knowledge is written the same way as in puzzle.py.
+
+Puzzles are built around a hidden solution: a claim is negated if
+needed so that it is true exactly when its speaker is a knight, so
+every puzzle has at least that solution.
+"""
+
+import random
+
+from logic import (And, Biconditional, Implication, Not, Or, Symbol,
+                   count_models)
+
+# Chance that a claim stops nesting before reaching the full depth
+LEAF_CHANCE = 0.3
+
+# Connectives a nested claim is built from
+CONNECTIVES = ("not", "and", "or", "implies", "iff", "says")
+
+
+def inhabitant(i):
+    """Returns the name of inhabitant i: A, B, ..., Z, AA, AB, ..."""
+    name = ""
+    i += 1
+    while i:
+        i, letter = divmod(i - 1, 26)
+        name = chr(ord("A") + letter) + name
+    return name
+
+
+def says(knight, knave, claim):
+    """Returns the knowledge that an inhabitant made a claim."""
+    return And(Implication(knight, claim), Implication(knave, Not(claim)))
+
+
+class Puzzle():
+
+    def __init__(self, names, claims, solution=None):
+        """
+        Builds a puzzle from inhabitant names and a list of (speaker,
+        claim) pairs, speaker being an index into names. `solution` is
+        the model the puzzle was built around, if any.
+        """
+        self.names = names
+        self.solution = solution
+        self.knights = [Symbol(f"{name} is a Knight") for name in names]
+        self.knaves = [Symbol(f"{name} is a Knave") for name in names]
+        self.claims = claims
+        self.knowledge = And(
+            *[Biconditional(knight, Not(knave))
+              for knight, knave in zip(self.knights, self.knaves)],
+            *[says(self.knights[speaker], self.knaves[speaker], claim)
+              for speaker, claim in claims]
+        )
+
+    def symbols(self):
+        """Returns the symbols to ask about, in puzzle.py's order."""
+        return [symbol for pair in zip(self.knights, self.knaves)
+                for symbol in pair]
+
+    def describe(self):
+        """Returns the claims as lines of text."""
+        return [f"{self.names[speaker]} says {claim.formula()}"
+                for speaker, claim in self.claims]
+
+
+def claim(rng, knights, knaves, depth):
+    """Returns a random claim about the inhabitants, nested to `depth`."""
+    if depth == 0 or rng.random() < LEAF_CHANCE:
+        i = rng.randrange(len(knights))
+        return knights[i] if rng.random() < 0.5 else knaves[i]
+
+    connective = rng.choice(CONNECTIVES)
+    if connective == "not":
+        return Not(claim(rng, knights, knaves, depth - 1))
+    if connective in ("and", "or"):
+        parts = [claim(rng, knights, knaves, depth - 1)
+                 for _ in range(rng.randint(2, 3))]
+        return And(*parts) if connective == "and" else Or(*parts)
+    left = claim(rng, knights, knaves, depth - 1)
+    right = claim(rng, knights, knaves, depth - 1)
+    if connective == "implies":
+        return Implication(left, right)
+    if connective == "iff":
+        return Biconditional(left, right)
+
+    # Someone else's claim, reported
+    i = rng.randrange(len(knights))
+    return says(knights[i], knaves[i], left)
+
+
+def generate(people, claims=None, depth=2, unique=False, seed=None):
+    """
+    Returns a random puzzle with `people` inhabitants making `claims`
+    claims (by default one each) nested up to `depth`. If `unique`,
+    claims are added until the puzzle has only one solution.
+    """
+    rng = random.Random(seed)
+    names = [inhabitant(i) for i in range(people)]
+    knights = [Symbol(f"{name} is a Knight") for name in names]
+    knaves = [Symbol(f"{name} is a Knave") for name in names]
+
+    solution = {}
+    for knight, knave in zip(knights, knaves):
+        is_knight = rng.random() < 0.5
+        solution[knight.name] = is_knight
+        solution[knave.name] = not is_knight
+
+    def consistent():
+        """Returns a random claim that agrees with the solution."""
+        speaker = rng.randrange(people)
+        sentence = claim(rng, knights, knaves, depth)
+        if sentence.evaluate(solution) != solution[knights[speaker].name]:
+            if isinstance(sentence, Not):
+                sentence = sentence.operand
+            else:
+                sentence = Not(sentence)
+        return speaker, sentence
+
+    made = [consistent() for _ in range(people if claims is None
+                                        else claims)]
+    puzzle = Puzzle(names, made, solution)
+    while unique and count_models(puzzle.knowledge) > 1:
+        made.append(consistent())
+        puzzle = Puzzle(names, made, solution)
+    return puzzle
@@ -1,7 +1,57 @@
 import itertools
+import weakref
+
+# Above this many symbols, model_check uses the SAT solver in sat.py
+# instead of enumerating every model
+ENUMERATION_LIMIT = 20
+
+# model_check evaluates 2 ** BLOCK_SYMBOLS models at once, one per bit
+BLOCK_SYMBOLS = 16
 
 
 class Sentence():
+    """
+    Sentences are immutable and hash-consed: building a sentence equal to
+    one that already exists returns the existing node. Equality is then
+    identity, and each node's hash and symbols are computed once, when
+    it is built.
+    """
+
+    __slots__ = ("hash_value", "symbol_set", "__weakref__")
+
+    # Every live sentence, by its structure
+    nodes = weakref.WeakValueDictionary()
+
+    @classmethod
+    def intern(cls, key, symbols, **fields):
+        """
+        Returns the sentence with structure `key`, building it from
+        `fields` and its frozenset of `symbols` if it does not exist.
+        """
+        node = Sentence.nodes.get(key)
+        if node is None:
+            node = object.__new__(cls)
+            for name, value in fields.items():
+                object.__setattr__(node, name, value)
+            object.__setattr__(node, "hash_value", hash(key))
+            object.__setattr__(node, "symbol_set", symbols)
+            Sentence.nodes[key] = node
+        return node
+
+    def __setattr__(self, name, value):
+        raise AttributeError("sentences are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("sentences are immutable")
+
+    def __eq__(self, other):
+        return self is other
+
+    def __hash__(self):
+        return self.hash_value
+
+    def __reduce__(self):
+        return (type(self), tuple(self.children()))
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -12,8 +62,61 @@ class Sentence():
         return ""
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozenset of all symbols in the logical sentence."""
+        return self.symbol_set
+
+    def children(self):
+        """Returns the sentences this sentence is built from."""
+        return ()
+
+    def operation(self, operands):
+        """
+        Returns a Python expression computing this sentence from its
+        children's values, named in `operands`, and `true`.
+        """
+        raise Exception("nothing to compile")
+
+    def compile(self, symbols):
+        """
+        Compiles the sentence to a function evaluate(values, true=True),
+        where values[i] is the value of the symbol named symbols[i].
+
+        The function is straight-line code, one assignment per distinct
+        subsentence, using only &, | and ^ with `true`. So values may be
+        booleans, or integers holding one model per bit with `true` the
+        mask of all models, or NumPy boolean arrays of models.
+        """
+        position = {name: i for i, name in enumerate(symbols)}
+        names = {}
+        lines = []
+
+        # Children are named before their parents, without recursion,
+        # so deeply nested sentences compile too
+        stack = [(self, False)]
+        while stack:
+            sentence, ready = stack.pop()
+            if sentence in names:
+                continue
+            if isinstance(sentence, Symbol):
+                if sentence.name not in position:
+                    raise Exception(f"variable {sentence.name} not in model")
+                names[sentence] = f"values[{position[sentence.name]}]"
+            elif not ready:
+                stack.append((sentence, True))
+                for child in sentence.children():
+                    stack.append((child, False))
+            else:
+                operands = [names[child] for child in sentence.children()]
+                names[sentence] = f"t{len(lines)}"
+                lines.append(
+                    f"    t{len(lines)} = {sentence.operation(operands)}\n"
+                )
+
+        source = ("def evaluate(values, true=True):\n" + "".join(lines)
+                  + f"    return {names[self]}\n")
+        namespace = {}
+        exec(source, namespace)
+        return namespace["evaluate"]
 
     @classmethod
     def validate(cls, sentence):
@@ -43,15 +146,13 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
-    def __init__(self, name):
-        self.name = name
+    def __new__(cls, name):
+        return cls.intern(("symbol", name), frozenset([name]), name=name)
 
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
-
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __reduce__(self):
+        return (Symbol, (self.name,))
 
     def __repr__(self):
         return self.name
@@ -65,20 +166,14 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
-
 
 class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
-
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+    __slots__ = ("operand",)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def __new__(cls, operand):
+        Sentence.validate(operand)
+        return cls.intern(("not", operand), operand.symbols(),
+                          operand=operand)
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -89,23 +184,23 @@ class Not(Sentence):
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def children(self):
+        return (self.operand,)
+
+    def operation(self, operands):
+        return f"true ^ {operands[0]}"
 
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+    __slots__ = ("conjuncts",)
+
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
-
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
+        symbols = frozenset().union(
+            *[conjunct.symbols() for conjunct in conjuncts]
         )
+        return cls.intern(("and", conjuncts), symbols, conjuncts=conjuncts)
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -114,8 +209,12 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
-        Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        """
+        Returns this conjunction with `conjunct` added. Sentences are
+        immutable, so the result must be kept: `knowledge =
+        knowledge.add(conjunct)`.
+        """
+        return And(*self.conjuncts, conjunct)
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
@@ -126,23 +225,23 @@ class And(Sentence):
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def children(self):
+        return self.conjuncts
+
+    def operation(self, operands):
+        return " & ".join(["true"] + operands)
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
-
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
+        symbols = frozenset().union(
+            *[disjunct.symbols() for disjunct in disjuncts]
         )
+        return cls.intern(("or", disjuncts), symbols, disjuncts=disjuncts)
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -157,24 +256,22 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def children(self):
+        return self.disjuncts
+
+    def operation(self, operands):
+        return " | ".join(["true ^ true"] + operands)
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
-
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
-
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        return cls.intern(("implies", antecedent, consequent),
+                          antecedent.symbols() | consequent.symbols(),
+                          antecedent=antecedent, consequent=consequent)
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -188,76 +285,186 @@ class Implication(Sentence):
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def children(self):
+        return (self.antecedent, self.consequent)
+
+    def operation(self, operands):
+        return f"(true ^ {operands[0]}) | {operands[1]}"
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
-
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
-
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+        return cls.intern(("biconditional", left, right),
+                          left.symbols() | right.symbols(),
+                          left=left, right=right)
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
 
     def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
+        return self.left.evaluate(model) == self.right.evaluate(model)
 
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+    def children(self):
+        return (self.left, self.right)
+
+    def operation(self, operands):
+        return f"true ^ {operands[0]} ^ {operands[1]}"
+
+
+class KnowledgeBase():
+    """
+    Knowledge compiled once to clauses for the SAT solver in sat.py.
+    Clauses the solver learns are kept, so a series of queries against
+    the same knowledge gets faster rather than starting over each time.
+    """
+
+    def __init__(self, *sentences):
+        import sat
+        self.cnf = sat.CNF()
+        self.solver = sat.Solver()
+        self.loaded = 0
+        for sentence in sentences:
+            self.tell(sentence)
+
+    def tell(self, sentence):
+        """Adds a sentence to the knowledge base."""
+        Sentence.validate(sentence)
+        self.cnf.add(sentence)
+        self.load()
+
+    def load(self):
+        """Passes clauses compiled since the last call to the solver."""
+        self.solver.grow(self.cnf.count)
+        for clause in self.cnf.clauses[self.loaded:]:
+            self.solver.add_clause(clause)
+        self.loaded = len(self.cnf.clauses)
+
+    def literal(self, query):
+        """Returns the solver literal equivalent to a query."""
+        Sentence.validate(query)
+        literal = self.cnf.literal(query)
+        self.load()
+        return literal
+
+    def satisfiable(self):
+        """Checks if any model makes the knowledge base true."""
+        return self.solver.solve()
+
+    def entails(self, query):
+        """Checks if knowledge base entails query."""
+        return not self.solver.solve([-self.literal(query)])
+
+    def entails_all(self, queries):
+        """
+        Checks which queries the knowledge base entails, returning a list
+        of booleans in the same order. Every model found along the way
+        rules out the queries it makes false, without a search of their own.
+        """
+        literals = [self.literal(query) for query in queries]
+        results = [True] * len(literals)
+        pending = list(range(len(literals)))
+
+        def rule_out(model):
+            for i in pending:
+                if model[abs(literals[i])] != (literals[i] > 0):
+                    results[i] = False
+            return [i for i in pending if results[i]]
+
+        if not self.solver.solve():
+            return results
+        pending = rule_out(self.solver.model)
+        while pending:
+            i = pending.pop()
+            if self.solver.solve([-literals[i]]):
+                results[i] = False
+                pending = rule_out(self.solver.model)
+        return results
+
+
+def count_models(knowledge, workers=1):
+    """
+    Returns the number of assignments to the knowledge base's symbols
+    that make it true. With several workers the count is split over a
+    process pool.
+    """
+    import sat
+    cnf = sat.CNF()
+    cnf.add(knowledge)
+    return sat.count(cnf.clauses, range(1, cnf.count + 1),
+                     cnf.variables.values(), workers)
+
+
+def iter_models(knowledge, workers=1):
+    """
+    Yields every model of the knowledge base as a dict from symbol name
+    to truth value. Models are generated as they are needed, so there
+    may be any number of them.
+    """
+    import sat
+    cnf = sat.CNF()
+    cnf.add(knowledge)
+    names = {var: name for name, var in cnf.variables.items()}
+    leaves = sat.leaves(cnf.clauses, range(1, cnf.count + 1),
+                        cnf.variables.values(), workers)
+    for literals, free in leaves:
+        model = {names[abs(literal)]: literal > 0
+                 for literal in literals if abs(literal) in names}
+        free = [var for var in free if var in names]
+        for values in itertools.product((True, False), repeat=len(free)):
+            for var, value in zip(free, values):
+                model[names[var]] = value
+            yield dict(model)
 
 
 def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
-
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
-
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
-
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+    """
+    Checks if knowledge base entails query. Small problems check every
+    model, many at a time as the bits of integers; larger ones are
+    compiled to CNF and given to a SAT solver.
+    """
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
-
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    if len(symbols) > ENUMERATION_LIMIT:
+        import sat
+        return sat.entails(knowledge, query)
+
+    # Knowledge entails query if no model has knowledge true, query false
+    counterexample = And(knowledge, Not(query)).compile(symbols)
+
+    # Model m of a block is bit m of every value: the first symbols
+    # follow the bits of m, the rest are fixed for the whole block
+    width = min(len(symbols), BLOCK_SYMBOLS)
+    size = 1 << width
+    true = (1 << size) - 1
+    values = [block_pattern(i, size) for i in range(width)]
+    values += [0] * (len(symbols) - width)
+
+    for block in range(1 << (len(symbols) - width)):
+        for i in range(width, len(symbols)):
+            values[i] = true if block >> (i - width) & 1 else 0
+        if counterexample(values, true):
+            return False
+    return True
+
+
+def block_pattern(i, size):
+    """
+    Returns a mask of `size` bits whose bit m is bit i of m, the values
+    of symbol i across a block of models.
+    """
+    pattern = ((1 << (1 << i)) - 1) << (1 << i)
+    period = 2 << i
+    while period < size:
+        pattern |= pattern << period
+        period *= 2
+    return pattern
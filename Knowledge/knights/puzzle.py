@@ -59,8 +59,9 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
-            for symbol in symbols:
-                if model_check(knowledge, symbol):
+            entailed = KnowledgeBase(knowledge).entails_all(symbols)
+            for symbol, entails in zip(symbols, entailed):
+                if entails:
                     print(f"    {symbol}")
 
 
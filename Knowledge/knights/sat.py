@@ -0,0 +1,688 @@
+"""
+Satisfiability backend for logic.py
+
+Sentences are compiled to conjunctive normal form with the Tseitin
+transform: every connective gets a fresh variable defined to be
+equivalent to it, so the clauses grow linearly with the sentence rather
+than exponentially. Variables are the integers 1, 2, ...; a literal is
+a variable or its negation.
+
+The solver is conflict-driven clause learning (CDCL): two watched
+literals per clause for unit propagation, first-UIP clause learning with
+non-chronological backjumping, VSIDS variable activity for decisions,
+phase saving and Luby restarts.
+
+Models are counted by DPLL with component caching (as in #SAT
+solvers): clauses that share no variable are counted separately and
+multiplied, and every component's count is remembered. Large problems
+are split into cubes, by fixing a few variables every possible way, and
+the cubes are shared out over a process pool.
+"""
+
+import heapq
+import math
+import multiprocessing
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Conflicts before the first restart; later restarts follow the Luby
+# sequence in multiples of this
+RESTART_BASE = 100
+
+# Multiplier for the activity bump, so recent conflicts weigh more
+ACTIVITY_DECAY = 0.95
+
+
+class CNF():
+    """
+    A growing set of clauses, with a variable for every symbol name and
+    every connective compiled so far.
+    """
+
+    def __init__(self):
+        self.clauses = []
+        self.variables = {}
+        self.count = 0
+        self.literals = {}
+
+    def variable(self, name):
+        """Returns the variable of a symbol name, adding it if new."""
+        if name not in self.variables:
+            self.count += 1
+            self.variables[name] = self.count
+        return self.variables[name]
+
+    def fresh(self):
+        """Returns a new variable standing for no symbol."""
+        self.count += 1
+        return self.count
+
+    def literal(self, sentence):
+        """
+        Returns a literal equivalent to `sentence`, adding the clauses
+        that define it. Equal subsentences share one literal.
+        """
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if sentence in self.literals:
+            return self.literals[sentence]
+
+        if isinstance(sentence, And):
+            parts = [self.literal(part) for part in sentence.conjuncts]
+            gate = self.fresh()
+            for part in parts:
+                self.clauses.append([-gate, part])
+            self.clauses.append([gate] + [-part for part in parts])
+        elif isinstance(sentence, Or):
+            parts = [self.literal(part) for part in sentence.disjuncts]
+            gate = self.fresh()
+            for part in parts:
+                self.clauses.append([gate, -part])
+            self.clauses.append([-gate] + parts)
+        elif isinstance(sentence, Implication):
+            antecedent = self.literal(sentence.antecedent)
+            consequent = self.literal(sentence.consequent)
+            gate = self.fresh()
+            self.clauses.append([-gate, -antecedent, consequent])
+            self.clauses.append([gate, antecedent])
+            self.clauses.append([gate, -consequent])
+        elif isinstance(sentence, Biconditional):
+            left = self.literal(sentence.left)
+            right = self.literal(sentence.right)
+            gate = self.fresh()
+            self.clauses.append([-gate, -left, right])
+            self.clauses.append([-gate, left, -right])
+            self.clauses.append([gate, left, right])
+            self.clauses.append([gate, -left, -right])
+        else:
+            raise TypeError(f"cannot compile {type(sentence).__name__}")
+
+        self.literals[sentence] = gate
+        return gate
+
+    def add(self, sentence):
+        """
+        Adds clauses asserting `sentence`. Connectives at the top are
+        asserted directly rather than through a defining variable.
+        """
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append(
+                [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            )
+        elif isinstance(sentence, Implication):
+            self.clauses.append([-self.literal(sentence.antecedent),
+                                 self.literal(sentence.consequent)])
+        elif (isinstance(sentence, Not)
+              and isinstance(sentence.operand, Or)):
+            for disjunct in sentence.operand.disjuncts:
+                self.add(Not(disjunct))
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+
+class Solver():
+    """
+    CDCL solver over integer literals. Clauses, including learned ones,
+    are kept across calls to `solve`, so it can be asked about the same
+    clauses under different assumptions.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.clauses = []
+        self.learned = []
+
+        # Indexed by variable; value is 1, -1 or 0 when unassigned
+        self.value = [0]
+        self.level = [0]
+        self.reason = [None]
+        self.activity = [0.0]
+        self.phase = [False]
+
+        # Clauses watching each literal, at index 2 * var + (lit < 0)
+        self.watches = [[], []]
+
+        self.trail = []
+        self.limits = []
+        self.head = 0
+        self.increment = 1.0
+        self.heap = []
+        self.ok = True
+        self.model = None
+        self.conflicts = 0
+
+    def grow(self, count):
+        """Makes room for variables up to `count`."""
+        for var in range(self.count + 1, count + 1):
+            self.value.append(0)
+            self.level.append(0)
+            self.reason.append(None)
+            self.activity.append(0.0)
+            self.phase.append(False)
+            self.watches.append([])
+            self.watches.append([])
+            heapq.heappush(self.heap, (0.0, var))
+        self.count = max(self.count, count)
+
+    def value_of(self, literal):
+        """Returns 1 if a literal is true, -1 if false, 0 if unassigned."""
+        value = self.value[abs(literal)]
+        return value if literal > 0 else -value
+
+    def add_clause(self, literals):
+        """
+        Adds a clause. Returns False if the clauses are now known to be
+        unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        self.backtrack(0)
+        self.grow(max((abs(literal) for literal in literals), default=0))
+
+        clause = []
+        for literal in literals:
+            value = self.value_of(literal)
+            if value == 1 or -literal in clause:
+                return True
+            if value == 0 and literal not in clause:
+                clause.append(literal)
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.clauses.append(clause)
+            self.watch(clause)
+        return self.ok
+
+    def watch(self, clause):
+        """Watches the first two literals of a clause."""
+        self.watches[watch_index(clause[0])].append(clause)
+        self.watches[watch_index(clause[1])].append(clause)
+
+    def assign(self, literal, reason):
+        var = abs(literal)
+        self.value[var] = 1 if literal > 0 else -1
+        self.level[var] = len(self.limits)
+        self.reason[var] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns every literal forced by unit clauses. Returns a clause
+        with all its literals false, or None if there is no conflict.
+        """
+        value = self.value
+        watches = self.watches
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watching = watches[watch_index(false)]
+            watches[watch_index(false)] = kept = []
+
+            for n, clause in enumerate(watching):
+                # Keep the falsified watch second
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = clause[0]
+                first_value = value[abs(first)]
+                if first < 0:
+                    first_value = -first_value
+                if first_value == 1:
+                    kept.append(clause)
+                    continue
+
+                # Look for another literal to watch
+                for k in range(2, len(clause)):
+                    other = clause[k]
+                    other_value = value[abs(other)]
+                    if other < 0:
+                        other_value = -other_value
+                    if other_value != -1:
+                        clause[1], clause[k] = other, false
+                        watches[watch_index(other)].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if first_value == -1:
+                        kept.extend(watching[n + 1:])
+                        return clause
+                    self.assign(first, clause)
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns (clause, level): the first-UIP clause learned from a
+        conflict, asserting literal first, and the level to jump back to.
+        """
+        level = self.level
+        current = len(self.limits)
+        learned = [None]
+        seen = set()
+        pending = 0
+        index = len(self.trail) - 1
+        clause = conflict
+
+        while True:
+            for literal in clause:
+                var = abs(literal)
+                if var not in seen and level[var] > 0:
+                    seen.add(var)
+                    self.bump(var)
+                    if level[var] == current:
+                        pending += 1
+                    else:
+                        learned.append(literal)
+
+            # Resolve on the latest assigned literal of this level
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reason[abs(literal)]
+
+        learned[0] = -literal
+        if len(learned) == 1:
+            return learned, 0
+
+        # The second watch must be the literal assigned last
+        second = max(range(1, len(learned)),
+                     key=lambda i: level[abs(learned[i])])
+        learned[1], learned[second] = learned[second], learned[1]
+        return learned, level[abs(learned[1])]
+
+    def bump(self, var):
+        self.activity[var] += self.increment
+        if self.activity[var] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+            self.heap = [(-self.activity[v], v)
+                         for v in range(1, self.count + 1)
+                         if not self.value[v]]
+            heapq.heapify(self.heap)
+        if not self.value[var]:
+            heapq.heappush(self.heap, (-self.activity[var], var))
+
+    def backtrack(self, target):
+        """Undoes every assignment above decision level `target`."""
+        if len(self.limits) <= target:
+            return
+        start = self.limits[target]
+        for literal in self.trail[start:]:
+            var = abs(literal)
+            self.value[var] = 0
+            self.reason[var] = None
+            self.phase[var] = literal > 0
+            heapq.heappush(self.heap, (-self.activity[var], var))
+        del self.trail[start:]
+        del self.limits[target:]
+        self.head = len(self.trail)
+
+    def decide(self):
+        """Returns the unassigned variable of highest activity, or None."""
+        while self.heap:
+            _, var = heapq.heappop(self.heap)
+            if not self.value[var]:
+                return var
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses are satisfiable with every literal in
+        `assumptions` true, leaving a satisfying assignment in self.model
+        (indexed by variable); returns False otherwise.
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        self.backtrack(0)
+        self.grow(max((abs(literal) for literal in assumptions), default=0))
+
+        restarts = 0
+        budget = RESTART_BASE * luby(restarts)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                budget -= 1
+                if not self.limits:
+                    self.ok = False
+                    return False
+                learned, target = self.analyze(conflict)
+                self.backtrack(target)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.learned.append(learned)
+                    self.watch(learned)
+                    self.assign(learned[0], learned)
+                self.increment /= ACTIVITY_DECAY
+                continue
+
+            if budget <= 0:
+                restarts += 1
+                budget = RESTART_BASE * luby(restarts)
+                self.backtrack(0)
+                continue
+
+            # Assumptions are the first decisions, one per level
+            if len(self.limits) < len(assumptions):
+                literal = assumptions[len(self.limits)]
+                value = self.value_of(literal)
+                if value == -1:
+                    self.backtrack(0)
+                    return False
+                self.limits.append(len(self.trail))
+                if value == 0:
+                    self.assign(literal, None)
+                continue
+
+            var = self.decide()
+            if var is None:
+                self.model = [value == 1 for value in self.value]
+                self.backtrack(0)
+                return True
+            self.limits.append(len(self.trail))
+            self.assign(var if self.phase[var] else -var, None)
+
+
+def watch_index(literal):
+    return 2 * literal if literal > 0 else 1 - 2 * literal
+
+
+def luby(i):
+    """Returns term i (from 0) of the Luby sequence 1, 1, 2, 1, 1, 2, 4..."""
+    size, power = 1, 0
+    while size < i + 1:
+        power += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) // 2
+        power -= 1
+        i %= size
+    return 1 << power
+
+
+def entails(knowledge, query):
+    """
+    Returns True if `knowledge` entails `query`, that is, if knowledge
+    together with the negation of query is unsatisfiable.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    cnf.add(Not(query))
+    solver = Solver()
+    for clause in cnf.clauses:
+        if not solver.add_clause(clause):
+            return True
+    return not solver.solve()
+
+
+def propagate_units(clauses, literals):
+    """
+    Assigns `literals`, and every literal then forced by a unit clause,
+    in a list of clause tuples. Returns (clauses, assigned): the clauses
+    not yet satisfied, without their false literals, and the set of
+    literals assigned. Returns None if a clause is falsified or empty.
+    """
+    if not all(clauses):
+        return None
+    pending = list(literals)
+    pending.extend(clause[0] for clause in clauses if len(clause) == 1)
+    assigned = set()
+    while pending:
+        literal = pending.pop()
+        if literal in assigned:
+            continue
+        if -literal in assigned:
+            return None
+        assigned.add(literal)
+
+        remaining = []
+        for clause in clauses:
+            if literal in clause:
+                continue
+            if -literal in clause:
+                clause = tuple(other for other in clause if other != -literal)
+                if not clause:
+                    return None
+                if len(clause) == 1:
+                    pending.append(clause[0])
+            remaining.append(clause)
+        clauses = remaining
+    return clauses, assigned
+
+
+def variables_of(clauses):
+    """Returns the set of variables occurring in clauses."""
+    return {abs(literal) for clause in clauses for literal in clause}
+
+
+def components(clauses):
+    """Splits clauses into groups that share no variable."""
+    parent = {}
+
+    def find(var):
+        while parent.setdefault(var, var) != var:
+            parent[var] = parent[parent[var]]
+            var = parent[var]
+        return var
+
+    for clause in clauses:
+        root = find(abs(clause[0]))
+        for literal in clause[1:]:
+            other = find(abs(literal))
+            if other != root:
+                parent[other] = root
+
+    groups = {}
+    for clause in clauses:
+        groups.setdefault(find(abs(clause[0])), []).append(clause)
+    return list(groups.values())
+
+
+def normalize(clauses):
+    """
+    Returns clauses as sorted tuples without repeated literals, dropping
+    clauses that hold both a literal and its negation.
+    """
+    normal = set()
+    for clause in clauses:
+        literals = set(clause)
+        if not any(-literal in literals for literal in literals):
+            normal.add(tuple(sorted(literals)))
+    return list(normal)
+
+
+def branch_variable(clauses):
+    """Returns the variable occurring in the most clauses."""
+    occurrences = {}
+    for clause in clauses:
+        for literal in clause:
+            var = abs(literal)
+            occurrences[var] = occurrences.get(var, 0) + 1
+    return max(occurrences, key=occurrences.get)
+
+
+class ModelCounter():
+    """
+    Counts and lists the models of normalized clauses. Counts of
+    components are cached across calls.
+    """
+
+    def __init__(self):
+        self.cache = {}
+
+    def count(self, clauses, variables):
+        """
+        Returns the number of assignments to the set `variables`, which
+        includes every variable of clauses, that satisfy the clauses.
+        """
+        result = propagate_units(clauses, ())
+        if result is None:
+            return 0
+        clauses, assigned = result
+        free = len(variables) - len(assigned) - len(variables_of(clauses))
+        total = 1 << free
+        for component in components(clauses):
+            total *= self.count_component(component)
+            if not total:
+                break
+        return total
+
+    def count_component(self, clauses):
+        """Returns the number of models of connected clauses."""
+        key = frozenset(clauses)
+        if key in self.cache:
+            return self.cache[key]
+
+        variables = variables_of(clauses)
+        var = branch_variable(clauses)
+        total = 0
+        for literal in (var, -var):
+            result = propagate_units(clauses, [literal])
+            if result is not None:
+                rest, assigned = result
+                scope = variables - {abs(other) for other in assigned}
+                total += self.count(rest, scope)
+        self.cache[key] = total
+        return total
+
+    def leaves(self, clauses, variables, literals=()):
+        """
+        Yields every model as (literals, free): every assignment to the
+        variables in the list `free` combined with `literals` is a model,
+        and no model is yielded twice. Branches without models are cut
+        off by counting them first.
+        """
+        result = propagate_units(clauses, ())
+        if result is None:
+            return
+        clauses, assigned = result
+        literals = literals + tuple(assigned)
+        scope = variables - {abs(literal) for literal in assigned}
+        if not clauses:
+            yield literals, sorted(scope)
+            return
+        if not self.count(clauses, scope):
+            return
+
+        var = branch_variable(clauses)
+        for literal in (var, -var):
+            result = propagate_units(clauses, [literal])
+            if result is not None:
+                rest, forced = result
+                yield from self.leaves(
+                    rest, scope - {abs(other) for other in forced},
+                    literals + tuple(forced)
+                )
+
+
+# Per-process state of a counting worker, set up by `start_counter`
+worker_clauses = None
+worker_variables = None
+worker_counter = None
+
+
+def start_counter(clauses, variables):
+    global worker_clauses, worker_variables, worker_counter
+    worker_clauses = clauses
+    worker_variables = variables
+    worker_counter = ModelCounter()
+
+
+def restrict(clauses, variables, cube):
+    """
+    Returns (clauses, variables, literals) for the part of the search
+    space where the literals of `cube` hold, or None if it is empty.
+    """
+    result = propagate_units(clauses, cube)
+    if result is None:
+        return None
+    rest, assigned = result
+    return (rest, variables - {abs(literal) for literal in assigned},
+            tuple(assigned))
+
+
+def count_cube(cube):
+    """Counts the models within a cube, in a worker."""
+    part = restrict(worker_clauses, worker_variables, cube)
+    if part is None:
+        return 0
+    rest, scope, _ = part
+    return worker_counter.count(rest, scope)
+
+
+def leaves_of_cube(cube):
+    """Lists the leaves (see `ModelCounter.leaves`) of a cube, in a worker."""
+    part = restrict(worker_clauses, worker_variables, cube)
+    if part is None:
+        return []
+    rest, scope, literals = part
+    return list(worker_counter.leaves(rest, scope, literals))
+
+
+def cubes(clauses, candidates, workers, split):
+    """
+    Returns every way of fixing `split` variables chosen from
+    `candidates` by how often they occur, as lists of literals. With no
+    `split`, makes about four cubes per worker.
+    """
+    if split is None:
+        split = math.ceil(math.log2(4 * workers))
+    occurrences = {var: 0 for var in candidates}
+    for clause in clauses:
+        for literal in clause:
+            if abs(literal) in occurrences:
+                occurrences[abs(literal)] += 1
+    chosen = sorted(occurrences, key=occurrences.get, reverse=True)[:split]
+    return [
+        [var if bits >> i & 1 else -var for i, var in enumerate(chosen)]
+        for bits in range(1 << len(chosen))
+    ]
+
+
+def count(clauses, variables, candidates=None, workers=1, split=None):
+    """
+    Returns the number of assignments to `variables` satisfying
+    clauses. With several workers the problem is split into cubes over
+    `candidates` (by default all variables) counted in parallel.
+    """
+    clauses = normalize(clauses)
+    variables = set(variables)
+    if workers <= 1:
+        return ModelCounter().count(clauses, variables)
+
+    parts = cubes(clauses, candidates or variables, workers, split)
+    with multiprocessing.Pool(workers, initializer=start_counter,
+                              initargs=(clauses, variables)) as pool:
+        return sum(pool.imap_unordered(count_cube, parts))
+
+
+def leaves(clauses, variables, candidates=None, workers=1, split=None):
+    """
+    Yields the models of clauses over `variables` as the leaves of
+    `ModelCounter.leaves`, splitting into cubes over `candidates` and
+    listing them in parallel if there are several workers.
+    """
+    clauses = normalize(clauses)
+    variables = set(variables)
+    if workers <= 1:
+        yield from ModelCounter().leaves(clauses, variables)
+        return
+
+    parts = cubes(clauses, candidates or variables, workers, split)
+    with multiprocessing.Pool(workers, initializer=start_counter,
+                              initargs=(clauses, variables)) as pool:
+        for part in pool.imap_unordered(leaves_of_cube, parts):
+            yield from part
@@ -0,0 +1,277 @@
+"""
+Mine probabilities for unknown Minesweeper cells
+
+The frontier (unknown cells mentioned by some sentence) is split into
+components that share no sentence. Each component's mine placements
+consistent with its sentences are enumerated by backtracking, grouped
+by how many mines they use. Components are then combined, weighting
+every placement by the ways to put the remaining mines on the cells no
+sentence mentions, which gives each cell's exact chance of being a mine.
+
+Without a total mine count, every unknown cell is instead taken to be a
+mine with probability `density`, independently.
+
+Enumeration is exponential in a component's size, so components with
+more than `limit` cells are estimated instead: each cell is taken to be
+a mine independently, with chances fitted so that every sentence's
+cells hold its count of mines on average.
+"""
+
+import math
+
+# Assumed share of cells that are mines when the total is not known
+DENSITY = 0.16
+
+# Largest component, in cells, whose placements are enumerated exactly
+LIMIT = 32
+
+# Passes over the sentences when estimating a larger component
+FITTING_ROUNDS = 20
+
+
+class Component():
+    """
+    Mine placements of one connected group of sentences. ways[k] is
+    the number of placements using k mines, and mines[k][i] how many of
+    those put a mine on cells[i].
+    """
+
+    def __init__(self, constraints):
+        cells = set()
+        for constraint_cells, _ in constraints:
+            cells |= constraint_cells
+        self.cells = order(cells, constraints)
+        self.ways = {}
+        self.mines = {}
+        self.enumerate(constraints)
+
+    def enumerate(self, constraints):
+        position = {cell: i for i, cell in enumerate(self.cells)}
+        count = len(self.cells)
+        touching = [[] for _ in range(count)]
+        for c, (constraint_cells, _) in enumerate(constraints):
+            for cell in constraint_cells:
+                touching[position[cell]].append(c)
+
+        # Mines each sentence still needs, and its cells still unassigned
+        need = [mines for _, mines in constraints]
+        left = [len(constraint_cells) for constraint_cells, _ in constraints]
+        placed = [0] * count
+
+        def search(i, total):
+            if i == count:
+                self.ways[total] = self.ways.get(total, 0) + 1
+                row = self.mines.setdefault(total, [0] * count)
+                for j in range(count):
+                    row[j] += placed[j]
+                return
+            for value in (0, 1):
+                for c in touching[i]:
+                    left[c] -= 1
+                    need[c] -= value
+                if all(0 <= need[c] <= left[c] for c in touching[i]):
+                    placed[i] = value
+                    search(i + 1, total + value)
+                for c in touching[i]:
+                    left[c] += 1
+                    need[c] += value
+            placed[i] = 0
+
+        search(0, 0)
+
+
+class Estimate():
+    """
+    Stands in for a Component too large to enumerate, with the same
+    ways and mines, here weighted by chance rather than counted. Cells
+    are taken to be independent; given k mines in all, a cell's chance
+    is scaled by k over the expected number of mines.
+    """
+
+    def __init__(self, constraints):
+        cells = set()
+        for constraint_cells, _ in constraints:
+            cells |= constraint_cells
+        self.cells = sorted(cells)
+
+        # Fit the chances to the sentences by scaling each sentence's
+        # cells in turn so their chances sum to its count
+        fitted = {cell: 0.5 for cell in self.cells}
+        for _ in range(FITTING_ROUNDS):
+            for constraint_cells, mines in constraints:
+                expected = sum(fitted[cell] for cell in constraint_cells)
+                if expected:
+                    scale = mines / expected
+                    for cell in constraint_cells:
+                        fitted[cell] = min(1.0, fitted[cell] * scale)
+        chances = [fitted[cell] for cell in self.cells]
+
+        # Chance of each number of mines, as independent cells give it
+        ways = [1.0]
+        for chance in chances:
+            ways = [(ways[k] if k < len(ways) else 0) * (1 - chance)
+                    + (ways[k - 1] * chance if k else 0)
+                    for k in range(len(ways) + 1)]
+        expected = sum(chances)
+        self.ways = {k: way for k, way in enumerate(ways) if way}
+        self.mines = {
+            k: [way * min(1, k * chance / expected) if expected else 0
+                for chance in chances]
+            for k, way in self.ways.items()
+        }
+
+
+def order(cells, constraints):
+    """
+    Orders cells so that each sentence's cells come close together,
+    letting the search detect a violated sentence early.
+    """
+    by_cell = {}
+    for constraint_cells, _ in constraints:
+        for cell in constraint_cells:
+            by_cell.setdefault(cell, []).append(constraint_cells)
+
+    ordered = []
+    seen = set()
+    for start in sorted(cells):
+        if start in seen:
+            continue
+        seen.add(start)
+        queue = [start]
+        while queue:
+            cell = queue.pop(0)
+            ordered.append(cell)
+            for constraint_cells in by_cell[cell]:
+                for other in sorted(constraint_cells - seen):
+                    seen.add(other)
+                    queue.append(other)
+    return ordered
+
+
+def components(sentences):
+    """Groups (cells, count) constraints that share cells."""
+    parent = {}
+
+    def find(cell):
+        while parent.setdefault(cell, cell) != cell:
+            parent[cell] = parent[parent[cell]]
+            cell = parent[cell]
+        return cell
+
+    for cells, _ in sentences:
+        cells = iter(cells)
+        root = find(next(cells))
+        for cell in cells:
+            other = find(cell)
+            if other != root:
+                parent[other] = root
+
+    groups = {}
+    for sentence in sentences:
+        groups.setdefault(find(next(iter(sentence[0]))), []).append(sentence)
+    return list(groups.values())
+
+
+def multiply(first, second):
+    """Multiplies two polynomials given as {power: coefficient}."""
+    product = {}
+    for i, a in first.items():
+        for j, b in second.items():
+            product[i + j] = product.get(i + j, 0) + a * b
+    return product
+
+
+class FrontierSolver():
+    """
+    Computes mine probabilities, keeping the placements of components
+    from the last call, since most components survive from one move to
+    the next.
+    """
+
+    def __init__(self, density=DENSITY, limit=LIMIT):
+        self.density = density
+        self.limit = limit
+        self.cache = {}
+
+    def component(self, constraints):
+        key = frozenset(
+            (frozenset(cells), count) for cells, count in constraints
+        )
+        if key not in self.cache:
+            cells = set()
+            for constraint_cells, _ in constraints:
+                cells |= constraint_cells
+            if len(cells) > self.limit:
+                self.cache[key] = Estimate(constraints)
+            else:
+                self.cache[key] = Component(constraints)
+        self.used[key] = self.cache[key]
+        return self.cache[key]
+
+    def probabilities(self, sentences, unknown, mines=None):
+        """
+        Returns a dict from each cell in `unknown` to its probability of
+        being a mine, given sentences about unknown cells as (cells,
+        count) pairs and the number of mines not yet found, if known.
+        Returns None if the sentences and mine count are inconsistent.
+        """
+        sentences = [(frozenset(cells), count)
+                     for cells, count in sentences if cells]
+        self.used = {}
+        parts = [self.component(group) for group in components(sentences)]
+        self.cache = self.used
+
+        frontier = set()
+        for part in parts:
+            frontier.update(part.cells)
+        outside = len(unknown) - len(frontier)
+
+        # weights[m]: weight of the frontier holding m mines in total,
+        # from the ways to place the rest outside it
+        if mines is None:
+            odds = self.density / (1 - self.density)
+
+            def weight(m):
+                return odds ** m
+        else:
+            def weight(m):
+                if not 0 <= mines - m <= outside:
+                    return 0
+                return math.comb(outside, mines - m)
+
+        # others[i]: placements of every component except part i
+        prefix = [{0: 1}]
+        for part in parts:
+            prefix.append(multiply(prefix[-1], part.ways))
+        suffix = [{0: 1}]
+        for part in reversed(parts):
+            suffix.append(multiply(suffix[-1], part.ways))
+        suffix.reverse()
+
+        total = sum(ways * weight(m) for m, ways in prefix[-1].items())
+        if not total:
+            return None
+
+        probabilities = {}
+        for i, part in enumerate(parts):
+            others = multiply(prefix[i], suffix[i + 1])
+            marginal = [0] * len(part.cells)
+            for k, row in part.mines.items():
+                scale = sum(ways * weight(k + m) for m, ways in others.items())
+                if scale:
+                    for j, count in enumerate(row):
+                        marginal[j] += count * scale
+            for cell, value in zip(part.cells, marginal):
+                probabilities[cell] = value / total
+
+        if outside:
+            if mines is None:
+                chance = self.density
+            else:
+                expected = sum(ways * weight(m) * (mines - m)
+                               for m, ways in prefix[-1].items())
+                chance = expected / total / outside
+            for cell in unknown:
+                if cell not in frontier:
+                    probabilities[cell] = chance
+        return probabilities
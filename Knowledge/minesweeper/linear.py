@@ -0,0 +1,131 @@
+"""
+Linear-algebra inference for Minesweeper
+
+Every sentence is a row of a 0/1 matrix over the unknown cells: the
+cells of the row sum to its count. The rows are kept in reduced row
+echelon form by Gaussian elimination with exact fractions, one row at a
+time as sentences arrive, and known cells are substituted out as they
+are found, so the matrix is never rebuilt.
+
+Combining rows brings in negative coefficients. Since every cell is 0
+or 1, a row whose value equals the smallest (or largest) sum its
+coefficients allow fixes all of its cells: with the smallest sum, cells
+with negative coefficients are mines and the rest are safe.
+"""
+
+import itertools
+from fractions import Fraction
+
+
+class ConstraintMatrix():
+
+    def __init__(self):
+
+        # Rows by number, each [coefficients by cell, value]
+        self.rows = {}
+        self.numbers = itertools.count()
+
+        # Row number of each pivot cell, and the rows using each cell
+        self.pivots = {}
+        self.index = {}
+
+        # Rows changed since `forced` last looked at them
+        self.dirty = set()
+
+    def add(self, cells, count):
+        """Adds the row saying `count` of `cells` are mines."""
+        self.insert({cell: Fraction(1) for cell in cells}, Fraction(count))
+
+    def insert(self, row, value):
+        """
+        Reduces a row by the existing pivots and, unless nothing is left
+        of it, adds it with a new pivot eliminated from the other rows.
+        """
+        # Pivot rows hold no other pivot cell, so no new ones appear
+        for cell in [cell for cell in row if cell in self.pivots]:
+            number = self.pivots[cell]
+            pivot_row, pivot_value = self.rows[number]
+            factor = row[cell]
+            for other, coefficient in pivot_row.items():
+                updated = row.get(other, 0) - factor * coefficient
+                if updated:
+                    row[other] = updated
+                else:
+                    del row[other]
+            value -= factor * pivot_value
+        if not row:
+            return
+
+        pivot = min(row)
+        scale = row[pivot]
+        for cell in row:
+            row[cell] /= scale
+        value /= scale
+
+        for number in list(self.index.get(pivot, ())):
+            self.subtract(number, row, value)
+
+        number = next(self.numbers)
+        self.rows[number] = [row, value]
+        self.pivots[pivot] = number
+        for cell in row:
+            self.index.setdefault(cell, set()).add(number)
+        self.dirty.add(number)
+
+    def subtract(self, number, pivot_row, pivot_value):
+        """Eliminates a pivot from row `number` using its pivot row."""
+        row, value = self.rows[number]
+        factor = row[min(pivot_row)]
+        for cell, coefficient in pivot_row.items():
+            updated = row.get(cell, 0) - factor * coefficient
+            if updated:
+                if cell not in row:
+                    self.index.setdefault(cell, set()).add(number)
+                row[cell] = updated
+            elif cell in row:
+                del row[cell]
+                self.index[cell].discard(number)
+        self.rows[number][1] = value - factor * pivot_value
+        self.dirty.add(number)
+
+    def assign(self, cell, mine):
+        """Substitutes a cell now known to be a mine or safe."""
+        known = 1 if mine else 0
+        reinsert = []
+        for number in self.index.pop(cell, ()):
+            row, value = self.rows[number]
+            self.rows[number][1] = value - row.pop(cell) * known
+            if self.pivots.get(cell) == number:
+                del self.pivots[cell]
+                reinsert.append(number)
+            else:
+                self.dirty.add(number)
+
+        # A row that lost its pivot needs a new one
+        for number in reinsert:
+            row, value = self.rows.pop(number)
+            self.dirty.discard(number)
+            for other in row:
+                self.index[other].discard(number)
+            self.insert(row, value)
+
+    def forced(self):
+        """
+        Returns (cell, mine) pairs for every cell fixed by the bounds of
+        a row changed since the last call.
+        """
+        forced = {}
+        for number in self.dirty:
+            if number not in self.rows:
+                continue
+            row, value = self.rows[number]
+            low = sum(c for c in row.values() if c < 0)
+            high = sum(c for c in row.values() if c > 0)
+            if value == low:
+                for cell, coefficient in row.items():
+                    forced[cell] = coefficient < 0
+            elif value == high:
+                for cell, coefficient in row.items():
+                    forced[cell] = coefficient > 0
+        self.dirty = set()
+        return list(forced.items())
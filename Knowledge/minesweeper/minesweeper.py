@@ -1,6 +1,26 @@
 import itertools
 import random
 
+import numpy as np
+
+from frontier import FrontierSolver
+from linear import ConstraintMatrix
+
+# Offsets of the eight neighbors of a cell
+NEIGHBORS = [(di, dj) for di in (-1, 0, 1) for dj in (-1, 0, 1)
+             if (di, dj) != (0, 0)]
+
+
+def shifted_sum(grid, height, width):
+    """
+    Returns, for every cell, the sum of `grid` over its neighbors,
+    where `grid` is padded by one cell on each side.
+    """
+    total = np.zeros((height, width), dtype=np.int8)
+    for di, dj in NEIGHBORS:
+        total += grid[1 + di:1 + di + height, 1 + dj:1 + dj + width]
+    return total
+
 
 class Minesweeper():
     """
@@ -12,23 +32,18 @@ class Minesweeper():
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
-        self.mines = set()
 
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
+        # Place mines in one draw, seeded from `random` so that seeding
+        # it still makes games repeatable
+        rng = np.random.default_rng(random.getrandbits(64))
+        self.board = np.zeros((height, width), dtype=bool)
+        cells = rng.choice(height * width, mines, replace=False)
+        self.board.flat[cells] = True
+        self.mines = {(int(i), int(j)) for i, j in zip(*self.board.nonzero())}
 
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        # Number of mines around every cell
+        padded = np.pad(self.board.astype(np.int8), 1)
+        self.counts = shifted_sum(padded, height, width)
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -50,7 +65,7 @@ class Minesweeper():
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return bool(self.board[i, j])
 
     def nearby_mines(self, cell):
         """
@@ -59,23 +74,32 @@ class Minesweeper():
         not including the cell itself.
         """
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
+        i, j = cell
+        return int(self.counts[i, j])
 
-        return count
+    def reveal(self, cell):
+        """
+        Returns the cells uncovered by clicking a safe cell: the cell
+        itself and, if no mines are near it, every cell reachable through
+        cells with no nearby mines, along with their neighbors.
+        """
+        empty = np.pad((self.counts == 0) & ~self.board, 1)
+        revealed = np.zeros((self.height + 2, self.width + 2), dtype=bool)
+        revealed[cell[0] + 1, cell[1] + 1] = True
+
+        # Breadth-first, one ring of cells at a time
+        frontier = revealed & empty
+        while frontier.any():
+            reached = np.zeros_like(revealed)
+            reached[1:-1, 1:-1] = shifted_sum(
+                frontier.astype(np.int8), self.height, self.width
+            ) > 0
+            reached &= ~revealed
+            revealed |= reached
+            frontier = reached & empty
+
+        return {(int(i) - 1, int(j) - 1)
+                for i, j in zip(*revealed.nonzero())}
 
     def won(self):
         """
@@ -94,8 +118,6 @@ class Sentence():
     def __init__(self, cells, count):
         self.cells = set(cells)
         self.count = count
-        self.mine = set()
-        self.safe = set()
 
     def __eq__(self, other):
         return self.cells == other.cells and self.count == other.count
@@ -107,46 +129,68 @@ class Sentence():
         """
         Returns the set of all cells in self.cells known to be mines.
         """
-        return self.mine
-        raise NotImplementedError
+        if self.count and len(self.cells) == self.count:
+            return set(self.cells)
+        return set()
 
     def known_safes(self):
         """
         Returns the set of all cells in self.cells known to be safe.
         """
-        return self.safe
-        raise NotImplementedError
+        if self.count == 0:
+            return set(self.cells)
+        return set()
 
     def mark_mine(self, cell):
         """
         Updates internal knowledge representation given the fact that
         a cell is known to be a mine.
         """
-        if(cell in self.cells):
-            self.mine.add(cell)
-        # raise NotImplementedError
+        if cell in self.cells:
+            self.cells.remove(cell)
+            self.count -= 1
 
     def mark_safe(self, cell):
         """
         Updates internal knowledge representation given the fact that
         a cell is known to be safe.
         """
-        if(cell in self.cells):
-            self.safe.add(cell)
-        # raise NotImplementedError
+        if cell in self.cells:
+            self.cells.remove(cell)
+
+    def signature(self):
+        """
+        Returns a hashable value that is equal for equal sentences.
+        """
+        return frozenset(self.cells), self.count
 
 
 class MinesweeperAI():
     """
     Minesweeper game player
+
+    Sentences are numbered, and every cell maps to the numbers of the
+    sentences that mention it, so marking a cell only touches those
+    sentences. Changed sentences go on a worklist, and inference runs
+    until the worklist is empty: resolved sentences are removed, and a
+    sentence that is a subset of another gives a new sentence for the
+    difference. Equal sentences are kept once.
+
+    With `linear`, every sentence from the board is also a row of a
+    constraint matrix (see linear.py), whose conclusions are drawn
+    whenever the worklist runs out.
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=None, linear=False):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
+        # Total number of mines, if known, for weighting guesses
+        self.total_mines = mines
+        self.solver = FrontierSolver()
+
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
@@ -154,28 +198,149 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Safe cells not yet clicked on
+        self.safe_moves = set()
+
+        # Sentences about the game known to be true, by number
+        self.sentences = {}
+        self.numbers = itertools.count()
+
+        # Numbers of the sentences mentioning each cell, and the number
+        # of the sentence with each signature
+        self.index = {}
+        self.signatures = {}
+
+        # Numbers of sentences changed since inference last ran
+        self.pending = []
+
+        # Optional constraint matrix of all sentences from the board
+        self.matrix = ConstraintMatrix() if linear else None
+
+    @property
+    def knowledge(self):
+        """List of sentences about the game known to be true."""
+        return list(self.sentences.values())
 
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
-        # print("PUT MINES",cell)
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self.resolve(cell, True)
+        if self.matrix is not None:
+            self.matrix.assign(cell, True)
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
-        # print("PUT SAFE",cell)
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        if cell not in self.moves_made:
+            self.safe_moves.add(cell)
+        self.resolve(cell, False)
+        if self.matrix is not None:
+            self.matrix.assign(cell, False)
+
+    def resolve(self, cell, mine):
+        """
+        Removes a cell now known to be a mine or safe from the sentences
+        that mention it.
+        """
+        for number in self.index.pop(cell, ()):
+            sentence = self.sentences[number]
+            if self.signatures.get(sentence.signature()) == number:
+                del self.signatures[sentence.signature()]
+            if mine:
+                sentence.mark_mine(cell)
+            else:
+                sentence.mark_safe(cell)
+
+            # An emptied sentence says nothing more, and the changed
+            # sentence may now duplicate another one
+            if not sentence.cells or sentence.signature() in self.signatures:
+                self.remove_sentence(number)
+            else:
+                self.signatures[sentence.signature()] = number
+                self.pending.append(number)
+
+    def add_sentence(self, cells, count):
+        """
+        Adds a sentence about cells not yet known to be mines or safe,
+        unless it is empty or already known.
+        """
+        sentence = Sentence(cells, count)
+        if not sentence.cells or sentence.signature() in self.signatures:
+            return
+        number = next(self.numbers)
+        self.sentences[number] = sentence
+        self.signatures[sentence.signature()] = number
+        for cell in sentence.cells:
+            self.index.setdefault(cell, set()).add(number)
+        self.pending.append(number)
+
+    def remove_sentence(self, number):
+        sentence = self.sentences.pop(number)
+        if self.signatures.get(sentence.signature()) == number:
+            del self.signatures[sentence.signature()]
+        for cell in sentence.cells:
+            numbers = self.index[cell]
+            numbers.discard(number)
+            if not numbers:
+                del self.index[cell]
+
+    def infer(self):
+        """
+        Draws conclusions from changed sentences until no sentence is
+        left to look at, and nothing more follows from the matrix.
+        """
+        while True:
+            self.infer_sentences()
+            if self.matrix is None:
+                return
+            forced = [(cell, mine) for cell, mine in self.matrix.forced()
+                      if cell not in self.mines and cell not in self.safes]
+            if not forced:
+                return
+            for cell, mine in forced:
+                if mine:
+                    self.mark_mine(cell)
+                else:
+                    self.mark_safe(cell)
+
+    def infer_sentences(self):
+        """Works through the changed sentences until none are left."""
+        while self.pending:
+            number = self.pending.pop()
+            sentence = self.sentences.get(number)
+            if sentence is None:
+                continue
+
+            # A resolved sentence marks its cells and is no longer needed
+            mines = sentence.known_mines()
+            safes = sentence.known_safes()
+            if mines or safes:
+                self.remove_sentence(number)
+                for cell in mines:
+                    self.mark_mine(cell)
+                for cell in safes:
+                    self.mark_safe(cell)
+                continue
+
+            # Subset inference with the sentences sharing a cell
+            neighbors = set()
+            for cell in sentence.cells:
+                neighbors |= self.index[cell]
+            neighbors.discard(number)
+            for other_number in neighbors:
+                other = self.sentences[other_number]
+                if sentence.cells < other.cells:
+                    self.add_sentence(other.cells - sentence.cells,
+                                      other.count - sentence.count)
+                elif other.cells < sentence.cells:
+                    self.add_sentence(sentence.cells - other.cells,
+                                      sentence.count - other.count)
 
     def add_knowledge(self, cell, count):
         """
@@ -192,47 +357,26 @@ class MinesweeperAI():
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
         """
-        # print("FIND ",cell," WITH ",count)
         self.moves_made.add(cell)
+        self.safe_moves.discard(cell)
         self.mark_safe(cell)
-        Xi,Yi = cell
+
+        # Neighbors not yet known, less the mines already found
         cells = set()
-        for x in range(-1,2):
-            for y in range(-1,2):
-                Xn = Xi + x
-                Yn = Yi + y
-                if(Xn >= 0 and Xn < self.width and Yn >= 0 and Yn < self.height):
-                    if((Xn,Yn) in self.mines):
+        for i in range(cell[0] - 1, cell[0] + 2):
+            for j in range(cell[1] - 1, cell[1] + 2):
+                if (i, j) == cell:
+                    continue
+                if 0 <= i < self.height and 0 <= j < self.width:
+                    if (i, j) in self.mines:
                         count -= 1
-                    if(not (Xn,Yn) in self.mines and not (Xn,Yn) in self.safes):
-                        cells.add((Xn,Yn))
-        # print("FIND RANGE",cells)
-        # print("REST : ",count)
-        for S in self.knowledge:
-            if(not len(cells)):break
-            if(cells in S.cells):
-                self.knowledge.append(Sentence(S.cells - cells,S.count - count))
-            if(S.cells in cells):
-                self.knowledge.append(Sentence(cells - S.cells,count - S.count))
-        if(count != 0):
-            self.knowledge.append(Sentence(cells,count))        
-        else:
-            for x in cells:
-                self.mark_safe(x)
-        # new word
-        for S in self.knowledge:
-            safe = S.known_safes()
-            mine = S.known_mines()
-            if len(safe) == len(S.cells) - S.count:
-                for x in S.cells:
-                    if(not x in safe and not x in mine):
-                        self.mark_mine(x)
-            if len(mine) == S.count:
-                for x in S.cells:
-                    if(not x in safe and not x in mine):
-                        self.mark_safe(x)
-        # check whole knowledge
-        # raise NotImplementedError
+                    elif (i, j) not in self.safes:
+                        cells.add((i, j))
+
+        self.add_sentence(cells, count)
+        if self.matrix is not None and cells:
+            self.matrix.add(cells, count)
+        self.infer()
 
     def make_safe_move(self):
         """
@@ -243,11 +387,28 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        for x in self.safes:
-            if(not x in self.moves_made):
-                return x
+        for cell in self.safe_moves:
+            return cell
         return None
-        raise NotImplementedError
+
+    def mine_probabilities(self):
+        """
+        Returns a dict from every cell not yet chosen or known to be a
+        mine to its probability of being a mine, or None if the knowledge
+        contradicts the total number of mines.
+        """
+        unknown = {
+            (i, j)
+            for i in range(self.height)
+            for j in range(self.width)
+            if (i, j) not in self.moves_made and (i, j) not in self.mines
+        }
+        remaining = None
+        if self.total_mines is not None:
+            remaining = self.total_mines - len(self.mines)
+        sentences = [(sentence.cells, sentence.count)
+                     for sentence in self.sentences.values()]
+        return self.solver.probabilities(sentences, unknown, remaining)
 
     def make_random_move(self):
         """
@@ -255,12 +416,21 @@ class MinesweeperAI():
         Should choose randomly among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+
+        Chooses among those the cells least likely to be a mine.
         """
-        # print("HAVE ",len(self.moves_made)," AND BOOM ",len(self.mines))
-        if(len(self.moves_made) + len(self.mines)== self.width * self.height ):return None
-        while True:
-            x = random.randint(0,self.width - 1)
-            y = random.randint(0,self.height - 1)
-            if(not (x,y) in self.moves_made and not (x,y) in self.mines):
-                return (x,y)
-        raise NotImplementedError
+        if len(self.moves_made) + len(self.mines) == self.width * self.height:
+            return None
+        probabilities = self.mine_probabilities()
+        if not probabilities:
+            while True:
+                i = random.randrange(self.height)
+                j = random.randrange(self.width)
+                if (i, j) not in self.moves_made and (i, j) not in self.mines:
+                    return (i, j)
+
+        lowest = min(probabilities.values())
+        return random.choice(sorted(
+            cell for cell, probability in probabilities.items()
+            if probability == lowest
+        ))
@@ -0,0 +1,135 @@
+"""
+Headless Minesweeper simulation
+
+Plays seeded games between the board and MinesweeperAI without pygame,
+spread over worker processes, and prints a JSON report with the win
+rate, moves and guesses per game, per-move inference and move choice
+time percentiles, and the peak number of sentences the AI held.
+
+Usage: python simulate.py [options]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+
+def play(height, width, mines, seed, tell_mines, linear):
+    """
+    Plays one game. Returns a dict with the outcome, move counts, peak
+    knowledge size and the seconds spent on each inference and choice.
+    """
+    random.seed(seed)
+    game = Minesweeper(height=height, width=width, mines=mines)
+    ai = MinesweeperAI(height=height, width=width,
+                       mines=mines if tell_mines else None, linear=linear)
+
+    inference = []
+    choice = []
+    guesses = 0
+    peak = 0
+    won = False
+    while True:
+        start = time.perf_counter()
+        move = ai.make_safe_move()
+        if move is None:
+            guesses += 1
+            move = ai.make_random_move()
+        choice.append(time.perf_counter() - start)
+        if move is None:
+            won = True
+            guesses -= 1
+            break
+        if game.is_mine(move):
+            break
+
+        start = time.perf_counter()
+        ai.add_knowledge(move, game.nearby_mines(move))
+        inference.append(time.perf_counter() - start)
+        peak = max(peak, len(ai.sentences))
+
+    return {"won": won, "moves": len(inference), "guesses": guesses,
+            "peak_knowledge": peak, "inference": inference,
+            "choice": choice}
+
+
+def percentiles(values):
+    """Returns the p50, p90, p99 and max of a list, in milliseconds."""
+    values = sorted(values)
+    if not values:
+        return {}
+
+    def at(fraction):
+        return 1000 * values[min(len(values) - 1, int(fraction * len(values)))]
+
+    return {"p50_ms": at(0.50), "p90_ms": at(0.90), "p99_ms": at(0.99),
+            "max_ms": 1000 * values[-1]}
+
+
+def run(games, height, width, mines, workers, seed, tell_mines, linear):
+    """Plays `games` games and returns the report as a dict."""
+    jobs = [(height, width, mines, seed + i, tell_mines, linear)
+            for i in range(games)]
+
+    start = time.perf_counter()
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(play, *zip(*jobs)))
+    else:
+        results = [play(*job) for job in jobs]
+    elapsed = time.perf_counter() - start
+
+    inference = []
+    choice = []
+    for result in results:
+        inference.extend(result["inference"])
+        choice.extend(result["choice"])
+    wins = sum(result["won"] for result in results)
+
+    return {
+        "board": {"height": height, "width": width, "mines": mines},
+        "linear": linear,
+        "games": games,
+        "workers": workers,
+        "seconds": elapsed,
+        "win_rate": wins / games,
+        "moves_per_game": sum(r["moves"] for r in results) / games,
+        "guesses_per_game": sum(r["guesses"] for r in results) / games,
+        "peak_knowledge": max(r["peak_knowledge"] for r in results),
+        "inference": percentiles(inference),
+        "choice": percentiles(choice)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--games", type=int, default=1000)
+    parser.add_argument("--height", type=int, default=8)
+    parser.add_argument("--width", type=int, default=8)
+    parser.add_argument("-m", "--mines", type=int, default=8)
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes")
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("--hide-mines", action="store_true",
+                        help="do not tell the AI the number of mines")
+    parser.add_argument("--linear", action="store_true",
+                        help="also infer from the constraint matrix")
+    args = parser.parse_args()
+    if not 0 <= args.mines <= args.height * args.width:
+        parser.error("too many mines for the board")
+
+    report = run(args.games, args.height, args.width, args.mines,
+                 max(1, args.workers), args.seed, not args.hide_mines,
+                 args.linear)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
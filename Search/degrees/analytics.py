@@ -0,0 +1,187 @@
+"""
+One-to-many analytics over the degrees co-star graph.
+
+`bfs` runs a single level-synchronous breadth-first search from one
+person and returns distance and predecessor arrays for everyone. The
+helpers below answer paths, histograms and eccentricities from those
+arrays without searching again.
+
+Usage: python analytics.py [directory] name
+"""
+
+import random
+import sys
+from array import array
+from collections import Counter
+
+import degrees
+
+UNREACHED = -1
+
+
+def bfs(graph, source):
+    """
+    Searches outward from person index `source`, one whole level at a
+    time. Returns (distance, via_person, via_movie) arrays indexed by
+    person: the degrees of separation (UNREACHED if not connected), and
+    the previous person and shared movie on one shortest path.
+    """
+    people = len(graph.person_ids)
+    distance = array("i", [UNREACHED]) * people
+    via_person = array("i", [UNREACHED]) * people
+    via_movie = array("i", [UNREACHED]) * people
+
+    # A movie only needs expanding the first time any star reaches it
+    movie_seen = bytearray(len(graph.movie_ids))
+
+    person_offsets, person_movies = graph.person_offsets, graph.person_movies
+    movie_offsets, movie_stars = graph.movie_offsets, graph.movie_stars
+
+    distance[source] = 0
+    level = [source]
+    depth = 0
+    while level:
+        depth += 1
+        following = []
+        for p in level:
+            for i in range(person_offsets[p], person_offsets[p + 1]):
+                m = person_movies[i]
+                if movie_seen[m]:
+                    continue
+                movie_seen[m] = 1
+                for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                    q = movie_stars[j]
+                    if distance[q] == UNREACHED:
+                        distance[q] = depth
+                        via_person[q] = p
+                        via_movie[q] = m
+                        following.append(q)
+        level = following
+    return distance, via_person, via_movie
+
+
+def path_to(graph, search, target):
+    """
+    Returns the (movie_id, person_id) path from the source of `search`,
+    the arrays returned by `bfs`, to person index `target`, or None if
+    the search did not reach it.
+    """
+    distance, via_person, via_movie = search
+    if distance[target] == UNREACHED:
+        return None
+    path = []
+    p = target
+    while distance[p] > 0:
+        path.append((graph.movie_ids[via_movie[p]], graph.person_ids[p]))
+        p = via_person[p]
+    path.reverse()
+    return path
+
+
+def histogram(distance):
+    """
+    Returns a Counter of degrees of separation over every reached person,
+    with unreached people counted under None.
+    """
+    counts = Counter(distance)
+    if UNREACHED in counts:
+        counts[None] = counts.pop(UNREACHED)
+    return counts
+
+
+def eccentricity(distance):
+    """
+    Returns the largest degree of separation from the search source to
+    anyone it reached.
+    """
+    return max(distance)
+
+
+def farthest(distance):
+    """Returns a person index at the greatest distance from the source."""
+    return max(range(len(distance)), key=distance.__getitem__)
+
+
+def connected_components(graph):
+    """
+    Labels every person with a component number, numbering components by
+    their first person. Returns (labels, sizes) where labels is an array
+    indexed by person and sizes lists each component's size.
+    """
+    people = len(graph.person_ids)
+    labels = array("i", [UNREACHED]) * people
+    sizes = []
+
+    person_offsets, person_movies = graph.person_offsets, graph.person_movies
+    movie_offsets, movie_stars = graph.movie_offsets, graph.movie_stars
+    movie_seen = bytearray(len(graph.movie_ids))
+
+    for start in range(people):
+        if labels[start] != UNREACHED:
+            continue
+        label = len(sizes)
+        labels[start] = label
+        size = 1
+        stack = [start]
+        while stack:
+            p = stack.pop()
+            for i in range(person_offsets[p], person_offsets[p + 1]):
+                m = person_movies[i]
+                if movie_seen[m]:
+                    continue
+                movie_seen[m] = 1
+                for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                    q = movie_stars[j]
+                    if labels[q] == UNREACHED:
+                        labels[q] = label
+                        size += 1
+                        stack.append(q)
+        sizes.append(size)
+    return labels, sizes
+
+
+def estimate_diameter(graph, samples=8, seed=None):
+    """
+    Estimates the diameter of the co-star graph by double sweeps: a BFS
+    from a random person, then another from the farthest person it
+    reached. Returns (lower_bound, eccentricities), where the bound is
+    the largest eccentricity seen and eccentricities maps each searched
+    person index to its eccentricity.
+    """
+    rng = random.Random(seed)
+    people = len(graph.person_ids)
+    eccentricities = {}
+    for _ in range(samples):
+        source = rng.randrange(people)
+        for _ in range(2):
+            if source in eccentricities:
+                break
+            distance = bfs(graph, source)[0]
+            eccentricities[source] = eccentricity(distance)
+            source = farthest(distance)
+    return max(eccentricities.values(), default=0), eccentricities
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python analytics.py [directory] name")
+    directory = sys.argv[1] if len(sys.argv) == 3 else "large"
+
+    print("Loading data...")
+    degrees.load_data(directory)
+    print("Data loaded.")
+
+    source = degrees.person_id_for_name(sys.argv[-1])
+    if source is None:
+        sys.exit("Person not found.")
+
+    distance = bfs(degrees.graph, degrees.graph.person_index[source])[0]
+    counts = histogram(distance)
+    for depth in sorted(d for d in counts if d is not None):
+        print(f"{depth} degrees: {counts[depth]}")
+    print(f"Not connected: {counts.get(None, 0)}")
+    print(f"Eccentricity: {eccentricity(distance)}")
+
+
+if __name__ == "__main__":
+    main()
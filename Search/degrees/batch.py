@@ -0,0 +1,172 @@
+"""
+Non-interactive degrees queries.
+
+Reads one source,target pair per line (CSV, so quote names containing
+commas) from a file or stdin. Each side may be a person id or a name.
+One JSON object per pair is written to stdout as results arrive, and a
+summary of latency and throughput is written to stderr.
+
+Usage: python batch.py [-w WORKERS] [directory] [pairs]
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import degrees
+import landmarks
+
+# Landmark index used instead of plain search, if one is loaded
+index = None
+exact = True
+
+
+def start_worker(directory, count, approximate):
+    """
+    Loads the dataset, and the landmark index if `count` is nonzero, in
+    a worker process that did not inherit them.
+    """
+    global index, exact
+    degrees.load_data(directory)
+    if count:
+        index = landmarks.load(directory, count)
+        exact = not approximate
+
+
+def resolve(person):
+    """
+    Returns the person_id for an id or an unambiguous name, else None.
+    """
+    if person in degrees.people:
+        return person
+    person_ids = degrees.names.get(person.lower(), set())
+    if len(person_ids) == 1:
+        return next(iter(person_ids))
+    return None
+
+
+def solve(pair):
+    """
+    Answers one (source, target) query and returns its JSON record.
+    """
+    start = time.perf_counter()
+    record = {"source": pair[0], "target": pair[1]}
+    source, target = resolve(pair[0]), resolve(pair[1])
+    if source is None or target is None:
+        missing = pair[0] if source is None else pair[1]
+        record["error"] = f"person not found or ambiguous: {missing}"
+    else:
+        if index is None:
+            path = degrees.shortest_path(source, target)
+        else:
+            path = index.shortest_path(source, target, exact)
+        record["degrees"] = None if path is None else len(path)
+        record["path"] = path
+    record["seconds"] = time.perf_counter() - start
+    return record
+
+
+def read_pairs(f):
+    """
+    Yields (source, target) pairs from CSV lines, skipping blank lines.
+    """
+    for row in csv.reader(f):
+        if not row or not "".join(row).strip():
+            continue
+        if len(row) != 2:
+            raise ValueError(f"expected 'source,target', got {row}")
+        yield row[0].strip(), row[1].strip()
+
+
+def percentile(ordered, fraction):
+    """Returns the value at `fraction` of an ascending list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run(directory, pairs, output, workers, count=0, approximate=False):
+    """
+    Streams results for `pairs` to `output` using `workers` processes,
+    and returns a summary dict. `count` and `approximate` describe the
+    landmark index loaded in this process, if any.
+    """
+    # With fork, workers inherit the loaded graph and index and share
+    # their pages read-only; elsewhere each worker loads them itself
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        initializer, initargs = None, ()
+    else:
+        context = multiprocessing.get_context()
+        initializer = start_worker
+        initargs = (directory, count, approximate)
+
+    latencies = []
+    start = time.perf_counter()
+    if workers == 1:
+        results = map(solve, pairs)
+        pool = None
+    else:
+        pool = context.Pool(workers, initializer, initargs)
+        results = pool.imap(solve, pairs, chunksize=16)
+    try:
+        for record in results:
+            latencies.append(record["seconds"])
+            output.write(json.dumps(record) + "\n")
+    finally:
+        if pool is not None:
+            pool.terminate()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "queries": len(latencies),
+        "workers": workers,
+        "seconds": elapsed,
+        "queries_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_p50": percentile(latencies, 0.50),
+        "latency_p90": percentile(latencies, 0.90),
+        "latency_p99": percentile(latencies, 0.99),
+        "latency_max": latencies[-1] if latencies else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("pairs", nargs="?", default="-",
+                        help="file of source,target lines (default: stdin)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes")
+    parser.add_argument("-l", "--landmarks", type=int, default=0,
+                        help="answer through a landmark index of this size")
+    parser.add_argument("-a", "--approximate", action="store_true",
+                        help="with --landmarks, allow paths via a landmark")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory)
+    print("Data loaded.", file=sys.stderr)
+
+    global index, exact
+    if args.landmarks:
+        index = landmarks.load(args.directory, args.landmarks)
+        exact = not args.approximate
+
+    workers = max(1, args.workers)
+    if args.pairs == "-":
+        summary = run(args.directory, read_pairs(sys.stdin), sys.stdout,
+                      workers, args.landmarks, args.approximate)
+    else:
+        with open(args.pairs, encoding="utf-8", newline="") as f:
+            summary = run(args.directory, read_pairs(f), sys.stdout,
+                          workers, args.landmarks, args.approximate)
+    print(json.dumps(summary), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
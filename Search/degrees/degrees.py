@@ -1,8 +1,15 @@
-import csv
 import sys
 
+import snapshot
+from graph import MoviesView, NamesView, PeopleView
+from nameindex import NameIndex
 from util import Node, StackFrontier, QueueFrontier
-sys.setrecursionlimit(1000000)
+
+# Compact co-star graph that the views below read from
+graph = None
+
+# Exact, prefix and fuzzy lookup of people by name
+name_index = None
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -17,40 +24,18 @@ movies = {}
 def load_data(directory):
     """
     Load data from CSV files into memory.
+
+    The data is held in an integer-indexed `Graph`; `names`, `people`
+    and `movies` are read-only views over it with the original shape.
+    The graph comes from the directory's binary snapshot when it is
+    current, and the snapshot is (re)written otherwise.
     """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    global graph, name_index, names, people, movies
+    graph = snapshot.load(directory)
+    name_index = NameIndex(graph)
+    names = NamesView(graph)
+    people = PeopleView(graph)
+    movies = MoviesView(graph)
 
 
 def main():
@@ -84,8 +69,6 @@ def main():
             movie = movies[path[i + 1][0]]["title"]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
-answ = {}
-done = {}
 
 def shortest_path(source, target):
     """
@@ -93,34 +76,83 @@ def shortest_path(source, target):
     that connect the source to the target.
 
     If no possible path, returns None.
+
+    Runs a bidirectional breadth-first search: one frontier grows from
+    the source, the other from the target, and each step expands a full
+    level of whichever frontier is currently smaller. All state is local
+    to the call, so repeated queries do not accumulate memory.
+    """
+    if source == target:
+        return []
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+
+    # Explored nodes on each side, keyed by person index
+    forward = {source: Node(state=source, parent=None, action=None)}
+    backward = {target: Node(state=target, parent=None, action=None)}
+
+    forward_frontier = QueueFrontier()
+    forward_frontier.add(forward[source])
+    backward_frontier = QueueFrontier()
+    backward_frontier.add(backward[target])
+
+    while not forward_frontier.empty() and not backward_frontier.empty():
+
+        # Expand whichever side has fewer nodes waiting
+        if len(forward_frontier) <= len(backward_frontier):
+            meeting = expand_level(forward_frontier, forward, backward)
+        else:
+            meeting = expand_level(backward_frontier, backward, forward)
+
+        if meeting is not None:
+            path = join_paths(forward[meeting], backward[meeting])
+            return [(graph.movie_ids[m], graph.person_ids[p]) for m, p in path]
+
+    return None
+
+
+def expand_level(frontier, explored, other):
     """
+    Expands every node currently in `frontier` by one step, recording
+    newly reached people in `explored`. States are person indices.
 
-    # print(source," to ",target)
-    done[source] = 1
-    # print(source in answ.keys())
-    if(source in answ):
-        return answ[source]
-    ans = []
-    maxx = 1000000000
-    for mv in people[source]['movies']:
-        for to in movies[mv]['stars']:
-            if to in done and not to in answ and not to == target: continue
-            if(to == target):
-                ans = [(mv,to)]
-                maxx = 1
-                break
-            v = shortest_path(to,target)
-            # print(source," -> ",to," use ",len(v))
-            if(not (v == None or len(v) == 0)):
-                if(len(v) + 1 <= maxx):
-                    ans = [(mv,to)]
-                    ans += v
-                    maxx = len(v) + 1
-    # print(source," use ",maxx)
-    answ[source] = ans
-    return ans
-    # TODO
-    raise NotImplementedError
+    Returns the first person that has also been reached by the other
+    side of the search, or None if the two sides have not met yet.
+    Because whole levels are expanded at a time, the first meeting point
+    lies on a shortest path.
+    """
+    for _ in range(len(frontier)):
+        node = frontier.remove()
+        for movie, person in graph.neighbors(node.state):
+            if person in explored:
+                continue
+            child = Node(state=person, parent=node, action=movie)
+            explored[person] = child
+            if person in other:
+                return person
+            frontier.add(child)
+    return None
+
+
+def join_paths(forward_node, backward_node):
+    """
+    Builds the (movie, person) index path through a meeting point, given
+    the meeting node from the source side and from the target side.
+    """
+    path = []
+    node = forward_node
+    while node.parent is not None:
+        path.append((node.action, node.state))
+        node = node.parent
+    path.reverse()
+
+    # Nodes on the target side point towards the target, so each step
+    # moves to the parent through the movie stored on the child
+    node = backward_node
+    while node.parent is not None:
+        path.append((node.action, node.parent.state))
+        node = node.parent
+    return path
 
 
 def person_id_for_name(name):
@@ -130,6 +162,16 @@ def person_id_for_name(name):
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
+        suggestions = name_index.lookup(name, 5)
+        if not suggestions:
+            return None
+        print(f"No '{name}'. Did you mean:")
+        for candidate in suggestions:
+            print(f"ID: {candidate['id']}, Name: {candidate['name']}, "
+                  f"Birth: {candidate['birth']}")
+        person_id = input("Intended Person ID: ")
+        if person_id in {candidate["id"] for candidate in suggestions}:
+            return person_id
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
@@ -154,12 +196,10 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
-    neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
-    return neighbors
+    return {
+        (graph.movie_ids[movie], graph.person_ids[person])
+        for movie, person in graph.neighbors(graph.person_index[person_id])
+    }
 
 
 if __name__ == "__main__":
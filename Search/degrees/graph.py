@@ -0,0 +1,255 @@
+"""
+Compact co-star graph for the degrees dataset.
+
+People and movies are interned to dense integers in the order they appear
+in the CSV files. Star credits are stored twice in compressed-sparse-row
+form: `person_movies[person_offsets[p]:person_offsets[p + 1]]` are the
+movies of person p, and `movie_stars[movie_offsets[m]:movie_offsets[m + 1]]`
+are the stars of movie m.
+"""
+
+import csv
+from array import array
+from collections.abc import Mapping
+
+
+class Graph():
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_stars,
+                 person_index=None, movie_index=None, name_index=None,
+                 name_trigrams=None):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+
+        # Lookups may be supplied prebuilt, e.g. by a snapshot
+        if person_index is None:
+            person_index = {
+                person_id: i for i, person_id in enumerate(person_ids)
+            }
+        if movie_index is None:
+            movie_index = {
+                movie_id: i for i, movie_id in enumerate(movie_ids)
+            }
+        if name_index is None:
+            name_index = {}
+            for i, name in enumerate(person_names):
+                name_index.setdefault(name.lower(), []).append(i)
+        self.person_index = person_index
+        self.movie_index = movie_index
+        self.name_index = name_index
+
+        # Trigram postings of the sorted names, if supplied prebuilt;
+        # NameIndex builds them otherwise
+        self.name_trigrams = name_trigrams
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Loads people.csv, movies.csv and stars.csv from a directory.
+        """
+        person_ids, person_names, person_births = [], [], []
+        person_index = {}
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row["id"] in person_index:
+                    continue
+                person_index[row["id"]] = len(person_ids)
+                person_ids.append(row["id"])
+                person_names.append(row["name"])
+                person_births.append(row["birth"])
+
+        movie_ids, movie_titles, movie_years = [], [], []
+        movie_index = {}
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row["id"] in movie_index:
+                    continue
+                movie_index[row["id"]] = len(movie_ids)
+                movie_ids.append(row["id"])
+                movie_titles.append(row["title"])
+                movie_years.append(row["year"])
+
+        # Credits naming an unknown person or movie are skipped
+        credit_people, credit_movies = array("i"), array("i")
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                p = person_index.get(row["person_id"])
+                m = movie_index.get(row["movie_id"])
+                if p is not None and m is not None:
+                    credit_people.append(p)
+                    credit_movies.append(m)
+
+        person_offsets, person_movies = build_csr(
+            len(person_ids), credit_people, credit_movies
+        )
+        movie_offsets, movie_stars = transpose_csr(
+            person_offsets, person_movies, len(movie_ids)
+        )
+        return cls(person_ids, person_names, person_births,
+                   movie_ids, movie_titles, movie_years,
+                   person_offsets, person_movies, movie_offsets, movie_stars)
+
+    def movies_of(self, p):
+        """Returns the movie indices person p starred in."""
+        return self.person_movies[
+            self.person_offsets[p]:self.person_offsets[p + 1]
+        ]
+
+    def stars_of(self, m):
+        """Returns the person indices who starred in movie m."""
+        return self.movie_stars[
+            self.movie_offsets[m]:self.movie_offsets[m + 1]
+        ]
+
+    def neighbors(self, p):
+        """
+        Yields (movie, person) index pairs for everyone who starred with
+        person p, including p itself, walking the CSR arrays in place.
+        """
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_stars = self.movie_offsets, self.movie_stars
+        for i in range(person_offsets[p], person_offsets[p + 1]):
+            m = person_movies[i]
+            for j in range(movie_offsets[m], movie_offsets[m + 1]):
+                yield m, movie_stars[j]
+
+    def people_named(self, name):
+        """Returns the person indices whose lowercase name is `name`."""
+        return self.name_index.get(name, [])
+
+
+def build_csr(rows, row_of, col_of):
+    """
+    Builds CSR offsets and column arrays from parallel (row, column)
+    arrays with a counting sort. Duplicate entries within a row are
+    removed and each row's columns are sorted.
+    """
+    offsets = array("i", bytes(4 * (rows + 1)))
+    for r in row_of:
+        offsets[r + 1] += 1
+    for r in range(rows):
+        offsets[r + 1] += offsets[r]
+
+    columns = array("i", bytes(4 * len(col_of)))
+    cursor = offsets[:-1]
+    for r, c in zip(row_of, col_of):
+        columns[cursor[r]] = c
+        cursor[r] += 1
+
+    # Sort and deduplicate each row, compacting the arrays in place
+    write = 0
+    start = offsets[0]
+    for r in range(rows):
+        end = offsets[r + 1]
+        previous = None
+        for c in sorted(columns[start:end]):
+            if c != previous:
+                columns[write] = c
+                write += 1
+                previous = c
+        start = end
+        offsets[r + 1] = write
+    del columns[write:]
+    return offsets, columns
+
+
+def transpose_csr(offsets, columns, width):
+    """
+    Returns the CSR arrays of the transposed matrix, whose rows are
+    the `width` columns of the original.
+    """
+    rows = array("i")
+    for r in range(len(offsets) - 1):
+        rows.extend([r] * (offsets[r + 1] - offsets[r]))
+    return build_csr(width, columns, rows)
+
+
+class PeopleView(Mapping):
+    """
+    Read-only view of a Graph with the same shape as the original
+    `people` dict: person_id -> {"name", "birth", "movies"}.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        p = graph.person_index[person_id]
+        return {
+            "name": graph.person_names[p],
+            "birth": graph.person_births[p],
+            "movies": {graph.movie_ids[m] for m in graph.movies_of(p)}
+        }
+
+    def __contains__(self, person_id):
+        return person_id in self.graph.person_index
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return len(self.graph.person_ids)
+
+
+class MoviesView(Mapping):
+    """
+    Read-only view of a Graph with the same shape as the original
+    `movies` dict: movie_id -> {"title", "year", "stars"}.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        m = graph.movie_index[movie_id]
+        return {
+            "title": graph.movie_titles[m],
+            "year": graph.movie_years[m],
+            "stars": {graph.person_ids[p] for p in graph.stars_of(m)}
+        }
+
+    def __contains__(self, movie_id):
+        return movie_id in self.graph.movie_index
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return len(self.graph.movie_ids)
+
+
+class NamesView(Mapping):
+    """
+    Read-only view of a Graph with the same shape as the original
+    `names` dict: lowercase name -> set of person_ids.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        graph = self.graph
+        if name not in graph.name_index:
+            raise KeyError(name)
+        return {graph.person_ids[p] for p in graph.name_index[name]}
+
+    def __contains__(self, name):
+        return name in self.graph.name_index
+
+    def __iter__(self):
+        return iter(self.graph.name_index)
+
+    def __len__(self):
+        return len(self.graph.name_index)
@@ -0,0 +1,353 @@
+"""
+Landmark distance index for fast degrees queries.
+
+A handful of well-connected "landmark" people are chosen and the degrees
+of separation from each of them to everyone is stored, one byte per
+person. For any two people u and t and landmark L, the triangle
+inequality gives
+
+    |d(L, u) - d(L, t)| <= d(u, t) <= d(L, u) + d(L, t)
+
+These bounds answer disconnected pairs immediately and return exact
+paths when the bounds meet. Otherwise an exact search runs with them:
+either a bidirectional BFS that drops people who cannot lie on a path
+within the upper bound, or an A* search using the lower bound as its
+heuristic (ALT). A fast approximate mode returns the path through the
+best landmark.
+
+Usage: python landmarks.py [directory] [landmarks]
+"""
+
+import os
+import struct
+import sys
+from array import array
+
+import analytics
+import degrees
+import snapshot
+from util import Node, PriorityFrontier, QueueFrontier
+
+FILENAME = "degrees.landmarks"
+MAGIC = b"DEGLMK\0\0"
+VERSION = 2
+HEADER = struct.Struct("=8sIIII6q")
+
+# Distances are stored in one byte; UNREACHED marks other components
+UNREACHED = 255
+MAX_DISTANCE = 254
+
+
+class LandmarkIndex():
+
+    def __init__(self, graph, landmarks, distances, requested=None):
+        self.graph = graph
+        self.landmarks = landmarks
+        self.distances = distances
+
+        # Landmarks asked of `build`, which may have found fewer
+        self.requested = len(landmarks) if requested is None else requested
+
+    @classmethod
+    def build(cls, graph, count=16):
+        """
+        Chooses up to `count` landmarks, preferring people with many
+        co-star credits and skipping anyone who has a landmark as a
+        direct co-star, and records their distances to everyone.
+        """
+        def credits(p):
+            return sum(graph.movie_offsets[m + 1] - graph.movie_offsets[m]
+                       for m in graph.movies_of(p))
+
+        candidates = sorted(range(len(graph.person_ids)),
+                            key=credits, reverse=True)
+        landmarks, distances = [], []
+        for p in candidates:
+            if len(landmarks) == count:
+                break
+            if any(d[p] <= 1 for d in distances):
+                continue
+            distance = analytics.bfs(graph, p)[0]
+            if max(distance) > MAX_DISTANCE:
+                raise ValueError("degrees of separation exceed index range")
+            landmarks.append(p)
+            distances.append(bytearray(
+                UNREACHED if d == analytics.UNREACHED else d
+                for d in distance
+            ))
+        return cls(graph, landmarks, distances, count)
+
+    def save(self, path, stamp):
+        """
+        Writes the index to `path`, tagged with the dataset's CSV
+        signature `stamp` from `snapshot.signature`.
+        """
+        people = len(self.graph.person_ids)
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(self.landmarks),
+                                self.requested, people, *stamp))
+            f.write(array("i", self.landmarks).tobytes())
+            for distance in self.distances:
+                f.write(distance)
+
+    @classmethod
+    def load(cls, graph, path, stamp):
+        """
+        Reads an index written by `save` for the same graph, or returns
+        None if the file is missing or was built for other CSV files.
+        """
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) < HEADER.size:
+            return None
+        (magic, version, count, requested, people,
+         *written) = HEADER.unpack_from(data)
+        if (magic != MAGIC or version != VERSION
+                or people != len(graph.person_ids)
+                or tuple(written) != tuple(stamp)
+                or len(data) != HEADER.size + count * (4 + people)):
+            return None
+
+        position = HEADER.size + 4 * count
+        landmarks = array("i", data[HEADER.size:position]).tolist()
+        distances = []
+        for _ in range(count):
+            distances.append(data[position:position + people])
+            position += people
+        return cls(graph, landmarks, distances, requested)
+
+    def bounds(self, u, t):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        person indices u and t. Returns None if some landmark shows they
+        are in different components. The upper bound is None when no
+        landmark reaches both.
+        """
+        lower, upper = 0, None
+        for distance in self.distances:
+            du, dt = distance[u], distance[t]
+            if du == UNREACHED and dt == UNREACHED:
+                continue
+            if du == UNREACHED or dt == UNREACHED:
+                return None
+            lower = max(lower, abs(du - dt))
+            if upper is None or du + dt < upper:
+                upper = du + dt
+        return lower, upper
+
+    def shortest_path(self, source, target, exact=True, astar=False):
+        """
+        Returns a list of (movie_id, person_id) pairs connecting the
+        source to the target, like `degrees.shortest_path`, or None if
+        they are not connected.
+
+        With `exact`, the path is a shortest one, found by a pruned
+        bidirectional search or, with `astar`, by A* search. Otherwise it
+        is the shortest path through a single landmark, which may be
+        longer.
+        """
+        graph = self.graph
+        u = graph.person_index[source]
+        t = graph.person_index[target]
+        if u == t:
+            return []
+
+        bounds = self.bounds(u, t)
+        if bounds is None:
+            return None
+        lower, upper = bounds
+        if upper is not None and (not exact or lower == upper):
+            path = self.landmark_path(u, t)
+        elif astar or upper is None:
+            path = self.astar(u, t)
+        else:
+            path = self.pruned_search(u, t, upper)
+        if path is None:
+            return None
+        return [(graph.movie_ids[m], graph.person_ids[p]) for m, p in path]
+
+    def landmark_path(self, u, t):
+        """
+        Returns a (movie, person) index path from u to t through the
+        landmark with the smallest d(L, u) + d(L, t), found by walking
+        downhill in that landmark's distances from both ends.
+        """
+        distance = min(
+            (d for d in self.distances
+             if d[u] != UNREACHED and d[t] != UNREACHED),
+            key=lambda d: d[u] + d[t]
+        )
+
+        # Steps from u towards the landmark
+        outward = self.descend(distance, u)
+
+        # Steps from t towards the landmark, then reversed
+        inward = self.descend(distance, t)
+        chain = [t] + [p for _, p in inward]
+        returning = [
+            (inward[i][0], chain[i]) for i in reversed(range(len(inward)))
+        ]
+
+        # Both walks may share people near the landmark; cut out any loop
+        path = []
+        position = {u: 0}
+        for m, p in outward + returning:
+            if p in position:
+                for _, q in path[position[p]:]:
+                    del position[q]
+                del path[position[p]:]
+                position[p] = len(path)
+            else:
+                path.append((m, p))
+                position[p] = len(path)
+        return path
+
+    def descend(self, distance, p):
+        """
+        Returns the (movie, person) steps from p to a landmark, each to a
+        co-star one degree closer to it.
+        """
+        steps = []
+        while distance[p] > 0:
+            for m, q in self.graph.neighbors(p):
+                if distance[q] == distance[p] - 1:
+                    steps.append((m, q))
+                    p = q
+                    break
+        return steps
+
+    def lower_bound(self, u, t):
+        """Returns the landmark lower bound on the distance from u to t."""
+        best = 0
+        for distance in self.distances:
+            du, dt = distance[u], distance[t]
+            if du != UNREACHED and dt != UNREACHED and abs(du - dt) > best:
+                best = abs(du - dt)
+        return best
+
+    def pruned_search(self, u, t, upper):
+        """
+        Returns a shortest (movie, person) index path from u to t by
+        bidirectional BFS, given that a path of length `upper` exists.
+
+        A person reached at depth g from one end whose lower bound to the
+        other end exceeds upper - g cannot be on a shortest path, so it
+        is not expanded. Whole levels are expanded at a time, so the first
+        meeting point still lies on a shortest path.
+        """
+        sides = []
+        for start, goal in ((u, t), (t, u)):
+            node = Node(state=start, parent=None, action=None)
+            frontier = QueueFrontier()
+            frontier.add(node)
+            sides.append({"explored": {start: node}, "frontier": frontier,
+                          "goal": goal, "depth": 0})
+
+        forward, backward = sides
+        while not forward["frontier"].empty() and \
+                not backward["frontier"].empty():
+            if len(forward["frontier"]) <= len(backward["frontier"]):
+                side, other = forward, backward
+            else:
+                side, other = backward, forward
+
+            side["depth"] += 1
+            depth, goal = side["depth"], side["goal"]
+            explored, frontier = side["explored"], side["frontier"]
+            for _ in range(len(frontier)):
+                node = frontier.remove()
+                for m, q in self.graph.neighbors(node.state):
+                    if q in explored:
+                        continue
+                    child = Node(state=q, parent=node, action=m)
+                    if q in other["explored"]:
+                        explored[q] = child
+                        return degrees.join_paths(forward["explored"][q],
+                                                  backward["explored"][q])
+                    if depth + self.lower_bound(q, goal) > upper:
+                        continue
+                    explored[q] = child
+                    frontier.add(child)
+        return None
+
+    def astar(self, u, t):
+        """
+        Returns a shortest (movie, person) index path from u to t by A*
+        search, using the landmark lower bound as the heuristic.
+        """
+        targets = [(d, d[t]) for d in self.distances if d[t] != UNREACHED]
+
+        def heuristic(p):
+            return max((abs(d[p] - dt) for d, dt in targets), default=0)
+
+        frontier = PriorityFrontier()
+        start = Node(state=u, parent=None, action=None)
+        nodes, cost = {u: start}, {u: 0}
+        frontier.add(start, heuristic(u))
+        closed = set()
+        while not frontier.empty():
+            node = frontier.remove()
+            if node.state in closed or nodes[node.state] is not node:
+                continue
+            if node.state == t:
+                path = []
+                while node.parent is not None:
+                    path.append((node.action, node.state))
+                    node = node.parent
+                path.reverse()
+                return path
+            closed.add(node.state)
+            g = cost[node.state] + 1
+            for m, q in self.graph.neighbors(node.state):
+                if q in closed or cost.get(q, g + 1) <= g:
+                    continue
+                cost[q] = g
+                nodes[q] = Node(state=q, parent=node, action=m)
+                frontier.add(nodes[q], g + heuristic(q))
+        return None
+
+
+def load(directory, count=16):
+    """
+    Returns the landmark index for the dataset loaded into `degrees`,
+    reading it from `directory` or building and saving it if needed.
+    """
+    path = os.path.join(directory, FILENAME)
+    stamp = snapshot.signature(directory)
+    index = LandmarkIndex.load(degrees.graph, path, stamp)
+    if index is None or index.requested < count:
+        index = LandmarkIndex.build(degrees.graph, count)
+        try:
+            index.save(path, stamp)
+        except OSError:
+            pass
+    elif index.requested > count:
+        # Landmarks are chosen greedily, so the first `count` of a larger
+        # index are the ones `build` would choose
+        index = LandmarkIndex(index.graph, index.landmarks[:count],
+                              index.distances[:count], count)
+    return index
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python landmarks.py [directory] [landmarks]")
+    directory = sys.argv[1] if len(sys.argv) >= 2 else "large"
+    count = int(sys.argv[2]) if len(sys.argv) == 3 else 16
+
+    print("Loading data...")
+    degrees.load_data(directory)
+    print("Data loaded.")
+
+    index = LandmarkIndex.build(degrees.graph, count)
+    index.save(os.path.join(directory, FILENAME),
+               snapshot.signature(directory))
+    names = [degrees.graph.person_names[p] for p in index.landmarks]
+    print(f"Indexed {len(names)} landmarks: {', '.join(names)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Name lookup for the degrees dataset: exact, prefix and fuzzy matches.
+
+Names are kept lowercased in one sorted array, so prefix completion is
+a binary search followed by a short scan. Fuzzy matching uses an
+inverted index from character trigrams to entries of that array, built
+when the data is loaded (or read from the snapshot), and ranks entries
+by the Dice coefficient of their trigram sets.
+"""
+
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+# Fuzzy matches scoring below this are not offered as candidates
+THRESHOLD = 0.3
+
+
+def trigrams(name):
+    """Returns the set of character trigrams of a padded lowercase name."""
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Postings():
+    """
+    Trigram inverted index in flat arrays. The entries holding trigram
+    keys[i] are entries[offsets[i]:offsets[i + 1]], and sizes[entry] is
+    the number of trigrams of an entry.
+    """
+
+    def __init__(self, keys, offsets, entries, sizes):
+        self.keys = keys
+        self.offsets = offsets
+        self.entries = entries
+        self.sizes = sizes
+
+    @classmethod
+    def build(cls, names):
+        """Builds the postings of a sequence of lowercase names."""
+        postings = {}
+        sizes = array("i")
+        for entry, name in enumerate(names):
+            grams = trigrams(name)
+            sizes.append(len(grams))
+            for gram in grams:
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array("i")
+                posting.append(entry)
+
+        keys = sorted(postings)
+        offsets = array("i", [0])
+        entries = array("i")
+        for gram in keys:
+            entries.extend(postings[gram])
+            offsets.append(len(entries))
+        return cls(keys, offsets, entries, sizes)
+
+    def get(self, gram):
+        """Returns the entries holding a trigram."""
+        i = bisect_left(self.keys, gram)
+        if i == len(self.keys) or self.keys[i] != gram:
+            return ()
+        return self.entries[self.offsets[i]:self.offsets[i + 1]]
+
+
+class NameIndex():
+
+    def __init__(self, graph):
+        self.graph = graph
+
+        # A snapshot graph already holds the sorted names, and reuses
+        # them; a graph read from CSV files keeps a dict
+        if isinstance(graph.name_index, dict):
+            lowered = [name.lower() for name in graph.person_names]
+            self.rows = array("i", sorted(range(len(lowered)),
+                                          key=lowered.__getitem__))
+            self.keys = [lowered[p] for p in self.rows]
+        else:
+            self.keys = graph.name_index.keys
+            self.rows = graph.name_index.rows
+
+        self.postings = graph.name_trigrams
+        if self.postings is None:
+            self.postings = Postings.build(self.keys)
+
+    def candidate(self, entry, score):
+        """Returns the description of the person at a sorted entry."""
+        p = self.rows[entry]
+        return {
+            "id": self.graph.person_ids[p],
+            "name": self.graph.person_names[p],
+            "birth": self.graph.person_births[p],
+            "score": score
+        }
+
+    def exact(self, name):
+        """Returns the sorted entries whose name is exactly `name`."""
+        name = name.lower()
+        entries = []
+        entry = bisect_left(self.keys, name)
+        while entry < len(self.keys) and self.keys[entry] == name:
+            entries.append(entry)
+            entry += 1
+        return entries
+
+    def prefix(self, prefix, k=10):
+        """
+        Returns up to k people whose name starts with `prefix`, in
+        alphabetical order, scored by how much of the name it covers.
+        """
+        prefix = prefix.lower()
+        matches = []
+        entry = bisect_left(self.keys, prefix)
+        while (len(matches) < k and entry < len(self.keys)
+               and self.keys[entry].startswith(prefix)):
+            score = len(prefix) / max(1, len(self.keys[entry]))
+            matches.append(self.candidate(entry, score))
+            entry += 1
+        return matches
+
+    def fuzzy(self, name, k=10, threshold=0.0):
+        """
+        Returns up to k people whose names share the most trigrams with
+        `name`, best first, scored by the Dice coefficient and scoring at
+        least `threshold`.
+        """
+        grams = trigrams(name.lower())
+        total = len(grams)
+        sizes = self.postings.sizes
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram))
+
+        # An entry sharing c trigrams has at least c, so scores at most
+        # 2c / (total + c); rank by c and stop once none can place
+        least = threshold * total / (2 - threshold)
+        ranked = sorted(((count, entry) for entry, count in shared.items()
+                         if count >= least), reverse=True)
+        best = []
+        for count, entry in ranked:
+            if len(best) == k and 2 * count / (total + count) <= best[0][0]:
+                break
+            score = 2 * count / (total + sizes[entry])
+            if score < threshold:
+                continue
+            if len(best) < k:
+                heapq.heappush(best, (score, -entry))
+            elif score > best[0][0]:
+                heapq.heapreplace(best, (score, -entry))
+
+        return [self.candidate(-entry, score)
+                for score, entry in sorted(best, reverse=True)]
+
+    def lookup(self, name, k=10):
+        """
+        Returns up to k candidate people for `name`: exact matches first,
+        then prefix completions, then fuzzy matches scoring at least
+        THRESHOLD, without repeats.
+        """
+        results = [self.candidate(entry, 1.0) for entry in self.exact(name)]
+        seen = {candidate["id"] for candidate in results}
+
+        def extend(candidates):
+            for candidate in candidates:
+                if len(results) >= k:
+                    break
+                if candidate["id"] not in seen:
+                    seen.add(candidate["id"])
+                    results.append(candidate)
+
+        extend(self.prefix(name, k))
+
+        # Trigrams are only consulted when the sorted names fall short
+        if len(results) < k:
+            extend(self.fuzzy(name, k, THRESHOLD))
+        return results[:k]
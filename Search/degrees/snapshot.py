@@ -0,0 +1,303 @@
+"""
+Binary snapshot of a degrees dataset for fast warm starts.
+
+The first load of a directory parses the CSV files and writes
+`degrees.snapshot` next to them. Later loads `mmap` that file and read
+the id tables, CSR adjacency arrays, name index and name trigram
+postings in place, without parsing or copying. The snapshot records
+the size and mtime of each CSV file and is rebuilt automatically when
+any of them change.
+
+Usage: python snapshot.py [directory]
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from itertools import accumulate
+
+from graph import Graph
+from nameindex import Postings
+
+FILENAME = "degrees.snapshot"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+MAGIC = b"DEGSNAP\0"
+VERSION = 2
+
+# Written in native byte order; a reader on another platform sees a
+# different marker and rebuilds instead of misreading the arrays
+BYTE_ORDER = 0x01020304
+
+HEADER = struct.Struct("=8sIII6q")
+SECTION = struct.Struct("=qq")
+
+# String tables are stored as an offsets section followed by a blob
+TABLES = ("person_ids", "person_names", "person_births",
+          "movie_ids", "movie_titles", "movie_years", "name_keys",
+          "trigram_keys")
+ARRAYS = ("person_offsets", "person_movies", "movie_offsets", "movie_stars",
+          "person_order", "movie_order", "name_people", "trigram_offsets",
+          "trigram_entries", "trigram_sizes")
+
+
+class StringTable():
+    """
+    Sequence of strings stored as UTF-8 in one buffer, decoded on access.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class PermutedTable():
+    """
+    Sequence presenting `table` in the order given by `order`.
+    """
+
+    def __init__(self, table, order):
+        self.table = table
+        self.order = order
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, i):
+        return self.table[self.order[i]]
+
+
+class SortedIndex(Mapping):
+    """
+    Maps strings to row numbers by binary search over sorted keys.
+
+    `keys` is a sorted sequence of strings and `rows` the row number for
+    each key. If `unique`, a lookup returns one row; otherwise it returns
+    the list of rows sharing the key.
+    """
+
+    def __init__(self, keys, rows, unique):
+        self.keys = keys
+        self.rows = rows
+        self.unique = unique
+
+    def __getitem__(self, key):
+        lo = bisect_left(self.keys, key)
+        if lo == len(self.keys) or self.keys[lo] != key:
+            raise KeyError(key)
+        if self.unique:
+            return self.rows[lo]
+        hi = bisect_right(self.keys, key, lo)
+        return list(self.rows[lo:hi])
+
+    def __iter__(self):
+        previous = None
+        for i in range(len(self.keys)):
+            key = self.keys[i]
+            if key != previous:
+                yield key
+                previous = key
+
+    def __len__(self):
+        if self.unique:
+            return len(self.keys)
+        return sum(1 for _ in self)
+
+
+def signature(directory):
+    """
+    Returns the (size, mtime) pairs of the CSV files as a flat tuple.
+    """
+    values = []
+    for name in SOURCES:
+        stat = os.stat(os.path.join(directory, name))
+        values.extend((stat.st_size, stat.st_mtime_ns))
+    return tuple(values)
+
+
+def encode_table(strings):
+    """
+    Returns (offsets, blob) bytes for a StringTable holding `strings`.
+    """
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = array("q", [0])
+    offsets.extend(accumulate(len(s) for s in encoded))
+    return offsets.tobytes(), b"".join(encoded)
+
+
+def write(graph, directory):
+    """
+    Writes a snapshot of `graph` for the dataset in `directory`.
+    """
+    person_order = sorted(range(len(graph.person_ids)),
+                          key=graph.person_ids.__getitem__)
+    movie_order = sorted(range(len(graph.movie_ids)),
+                         key=graph.movie_ids.__getitem__)
+    lowered = [name.lower() for name in graph.person_names]
+    name_people = sorted(range(len(lowered)), key=lowered.__getitem__)
+    name_keys = [lowered[p] for p in name_people]
+    postings = Postings.build(name_keys)
+
+    tables = {
+        "person_ids": graph.person_ids,
+        "person_names": graph.person_names,
+        "person_births": graph.person_births,
+        "movie_ids": graph.movie_ids,
+        "movie_titles": graph.movie_titles,
+        "movie_years": graph.movie_years,
+        "name_keys": name_keys,
+        "trigram_keys": postings.keys
+    }
+    arrays = {
+        "person_offsets": graph.person_offsets,
+        "person_movies": graph.person_movies,
+        "movie_offsets": graph.movie_offsets,
+        "movie_stars": graph.movie_stars,
+        "person_order": person_order,
+        "movie_order": movie_order,
+        "name_people": name_people,
+        "trigram_offsets": postings.offsets,
+        "trigram_entries": postings.entries,
+        "trigram_sizes": postings.sizes
+    }
+
+    sections = []
+    for name in TABLES:
+        sections.extend(encode_table(tables[name]))
+    for name in ARRAYS:
+        sections.append(array("i", arrays[name]).tobytes())
+
+    # Lay out sections after the header, each aligned to 8 bytes
+    position = HEADER.size + SECTION.size * len(sections)
+    layout = []
+    for section in sections:
+        position += -position % 8
+        layout.append((position, len(section)))
+        position += len(section)
+
+    path = os.path.join(directory, FILENAME)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDER, len(sections),
+                            *signature(directory)))
+        for offset, length in layout:
+            f.write(SECTION.pack(offset, length))
+        for (offset, length), section in zip(layout, sections):
+            f.write(bytes(offset - f.tell()))
+            f.write(section)
+    os.replace(temporary, path)
+
+
+def read(directory):
+    """
+    Maps the snapshot for `directory` into memory and returns a Graph
+    over it, or None if there is no snapshot or it is out of date.
+    """
+    path = os.path.join(directory, FILENAME)
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(buffer) < HEADER.size:
+        buffer.close()
+        return None
+
+    magic, version, byte_order, count, *stamp = HEADER.unpack_from(buffer)
+    if (magic != MAGIC or version != VERSION or byte_order != BYTE_ORDER
+            or count != 2 * len(TABLES) + len(ARRAYS)
+            or tuple(stamp) != signature(directory)):
+        buffer.close()
+        return None
+
+    view = memoryview(buffer)
+    sections = []
+    for i in range(count):
+        offset, length = SECTION.unpack_from(buffer,
+                                             HEADER.size + SECTION.size * i)
+        sections.append(view[offset:offset + length])
+
+    tables = {}
+    for i, name in enumerate(TABLES):
+        offsets, blob = sections[2 * i], sections[2 * i + 1]
+        tables[name] = StringTable(offsets.cast("q"), blob)
+    arrays = {}
+    for i, name in enumerate(ARRAYS):
+        arrays[name] = sections[2 * len(TABLES) + i].cast("i")
+
+    graph = Graph(
+        tables["person_ids"], tables["person_names"], tables["person_births"],
+        tables["movie_ids"], tables["movie_titles"], tables["movie_years"],
+        arrays["person_offsets"], arrays["person_movies"],
+        arrays["movie_offsets"], arrays["movie_stars"],
+        person_index=SortedIndex(
+            PermutedTable(tables["person_ids"], arrays["person_order"]),
+            arrays["person_order"], unique=True
+        ),
+        movie_index=SortedIndex(
+            PermutedTable(tables["movie_ids"], arrays["movie_order"]),
+            arrays["movie_order"], unique=True
+        ),
+        name_index=SortedIndex(
+            tables["name_keys"], arrays["name_people"], unique=False
+        ),
+        name_trigrams=Postings(
+            tables["trigram_keys"], arrays["trigram_offsets"],
+            arrays["trigram_entries"], arrays["trigram_sizes"]
+        )
+    )
+
+    # The graph's memoryviews keep the mapping open for its lifetime
+    graph.snapshot = buffer
+    return graph
+
+
+def load(directory):
+    """
+    Returns the Graph for `directory`, from its snapshot when it is
+    current, otherwise by parsing the CSV files and writing a new one.
+    """
+    graph = read(directory)
+    if graph is not None:
+        return graph
+
+    graph = Graph.from_csv(directory)
+    try:
+        write(graph, directory)
+    except OSError:
+        # A read-only dataset still loads, just without the cache
+        return graph
+
+    # Map the new snapshot rather than build the name trigrams again
+    return read(directory) or graph
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python snapshot.py [directory]")
+    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+
+    graph = Graph.from_csv(directory)
+    write(graph, directory)
+    print(f"Wrote {os.path.join(directory, FILENAME)}: "
+          f"{len(graph.person_ids)} people, {len(graph.movie_ids)} movies.")
+
+
+if __name__ == "__main__":
+    main()
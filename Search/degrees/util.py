@@ -1,3 +1,8 @@
+import heapq
+from collections import deque
+from itertools import count
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -7,24 +12,38 @@ class Node():
 
 class StackFrontier():
     def __init__(self):
-        self.frontier = []
+        self.frontier = deque()
+
+        # Maps each state to the number of its nodes in the frontier
+        self.states = {}
+
+    def __len__(self):
+        return len(self.frontier)
 
     def add(self, node):
         self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return state in self.states
 
     def empty(self):
         return len(self.frontier) == 0
 
+    def discard(self, node):
+        """Forgets one occurrence of the node's state after removal."""
+        remaining = self.states[node.state] - 1
+        if remaining:
+            self.states[node.state] = remaining
+        else:
+            del self.states[node.state]
+        return node
+
     def remove(self):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
-            return node
+            return self.discard(self.frontier.pop())
 
 
 class QueueFrontier(StackFrontier):
@@ -33,6 +52,27 @@ class QueueFrontier(StackFrontier):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
-            return node
+            return self.discard(self.frontier.popleft())
+
+
+class PriorityFrontier(StackFrontier):
+    """
+    Frontier that always removes the node with the lowest priority,
+    for weighted and heuristic searches. Nodes with equal priority
+    come out in the order they were added.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.frontier = []
+        self.counter = count()
+
+    def add(self, node, priority=0):
+        heapq.heappush(self.frontier, (priority, next(self.counter), node))
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            return self.discard(heapq.heappop(self.frontier)[2])
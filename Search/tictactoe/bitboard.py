@@ -0,0 +1,153 @@
+"""
+Bitboard Tic Tac Toe engine
+
+A position is two 9-bit integers, one per player, with cell (i, j) at
+bit 3 * i + j. Wins are looked up in a 512-entry table, and search is
+negamax with alpha-beta pruning over a transposition table keyed by the
+position's canonical form under the 8 symmetries of the board.
+"""
+
+FULL = 0b111111111
+
+LINES = (
+    0b000000111, 0b000111000, 0b111000000,  # rows
+    0b001001001, 0b010010010, 0b100100100,  # columns
+    0b100010001, 0b001010100                # diagonals
+)
+
+# WINS[bits] is True if the cells in `bits` contain a complete line
+WINS = tuple(
+    any(bits & line == line for line in LINES) for bits in range(1 << 9)
+)
+
+# Cells ordered centre, corners, edges, which tends to prune best
+MOVE_ORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+
+
+def symmetry_tables():
+    """
+    Returns, for each of the 8 rotations and reflections of the board,
+    a 512-entry table mapping a bitboard to its transformed bitboard.
+    """
+    def transform(cell, turns, flip):
+        i, j = divmod(cell, 3)
+        for _ in range(turns):
+            i, j = j, 2 - i
+        if flip:
+            j = 2 - j
+        return 3 * i + j
+
+    tables = []
+    for turns in range(4):
+        for flip in (False, True):
+            targets = [transform(cell, turns, flip) for cell in range(9)]
+            table = []
+            for bits in range(1 << 9):
+                mapped = 0
+                for cell in range(9):
+                    if bits >> cell & 1:
+                        mapped |= 1 << targets[cell]
+                table.append(mapped)
+            tables.append(tuple(table))
+    return tables
+
+
+SYMMETRIES = symmetry_tables()
+
+# Transposition table: canonical key -> (value, bound)
+EXACT, LOWER, UPPER = 0, 1, 2
+table = {}
+
+
+def canonical(me, them):
+    """
+    Returns one key shared by a position and all its symmetric images.
+    """
+    return min(t[me] | t[them] << 9 for t in SYMMETRIES)
+
+
+def encode(board, x, o):
+    """
+    Returns the (x, o) bitboards of a list-of-lists board whose cells
+    hold `x`, `o` or anything else for empty.
+    """
+    x_bits = o_bits = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == x:
+                x_bits |= 1 << (3 * i + j)
+            elif board[i][j] == o:
+                o_bits |= 1 << (3 * i + j)
+    return x_bits, o_bits
+
+
+def negamax(me, them, alpha, beta):
+    """
+    Returns the value of a position for the player to move, who holds
+    the cells in `me`: 1 for a forced win, -1 for a loss, 0 for a draw.
+    """
+    if WINS[them]:
+        return -1
+    if me | them == FULL:
+        return 0
+
+    key = canonical(me, them)
+    entry = table.get(key)
+    if entry is not None:
+        value, bound = entry
+        if bound == EXACT:
+            return value
+        if bound == LOWER and value >= beta:
+            return value
+        if bound == UPPER and value <= alpha:
+            return value
+
+    original = alpha
+    best = -2
+    occupied = me | them
+    for cell in MOVE_ORDER:
+        move = 1 << cell
+        if occupied & move:
+            continue
+        value = -negamax(them, me | move, -beta, -alpha)
+        if value > best:
+            best = value
+            if value > alpha:
+                alpha = value
+                if alpha >= beta:
+                    break
+
+    if best <= original:
+        table[key] = (best, UPPER)
+    elif best >= beta:
+        table[key] = (best, LOWER)
+    else:
+        table[key] = (best, EXACT)
+    return best
+
+
+def best_move(x_bits, o_bits):
+    """
+    Returns (cell, value) for the player to move on the given bitboards:
+    an optimal cell index, or None if the game is over, and its value
+    for that player.
+    """
+    if WINS[x_bits] or WINS[o_bits] or x_bits | o_bits == FULL:
+        return None, 0
+    if bin(x_bits).count("1") == bin(o_bits).count("1"):
+        me, them = x_bits, o_bits
+    else:
+        me, them = o_bits, x_bits
+
+    best_cell, best = None, -2
+    occupied = me | them
+    for cell in MOVE_ORDER:
+        move = 1 << cell
+        if occupied & move:
+            continue
+        value = -negamax(them, me | move, -1, 1)
+        if value > best:
+            best_cell, best = cell, value
+            if best == 1:
+                break
+    return best_cell, best
@@ -0,0 +1,123 @@
+"""
+Perfect-play book for Tic Tac Toe
+
+Every position reachable from the empty board is solved once and its
+best move and value are stored in one byte, at the position's base-3
+index (cell (i, j) is digit 3 * i + j: 0 empty, 1 X, 2 O). The book is
+read from book.bin on first use, and solved and written there if the
+file is missing.
+
+Usage: python book.py
+"""
+
+import os
+
+import bitboard
+
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+MAGIC = b"TTT1"
+POSITIONS = 3 ** 9
+
+# Entry for terminal or unreachable positions
+NO_MOVE = 0xFF
+
+# TERNARY[bits] is the base-3 number with a 1 digit at each set cell
+TERNARY = tuple(
+    sum(3 ** cell for cell in range(9) if bits >> cell & 1)
+    for bits in range(1 << 9)
+)
+
+book = None
+
+
+def index(x_bits, o_bits):
+    """Returns the book index of a position."""
+    return TERNARY[x_bits] + 2 * TERNARY[o_bits]
+
+
+def solve():
+    """
+    Solves every reachable position and returns the book as a bytearray
+    of POSITIONS entries, each (best cell << 2) | (value + 1).
+    """
+    entries = bytearray([NO_MOVE]) * POSITIONS
+    seen = set()
+    stack = [(0, 0)]
+    while stack:
+        x_bits, o_bits = stack.pop()
+        position = index(x_bits, o_bits)
+        if position in seen:
+            continue
+        seen.add(position)
+
+        cell, value = bitboard.best_move(x_bits, o_bits)
+        if cell is None:
+            continue
+        entries[position] = cell << 2 | (value + 1)
+
+        x_to_move = bin(x_bits).count("1") == bin(o_bits).count("1")
+        occupied = x_bits | o_bits
+        for move in range(9):
+            if occupied >> move & 1:
+                continue
+            if x_to_move:
+                stack.append((x_bits | 1 << move, o_bits))
+            else:
+                stack.append((x_bits, o_bits | 1 << move))
+    return entries
+
+
+def save(entries, path=PATH):
+    """Writes a solved book to `path`."""
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(entries)
+    os.replace(temporary, path)
+
+
+def load(path=PATH):
+    """
+    Returns the book from `path`, solving and saving it if the file is
+    missing or not a book.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:len(MAGIC)] == MAGIC and len(data) == len(MAGIC) + POSITIONS:
+            return data[len(MAGIC):]
+    except OSError:
+        pass
+
+    entries = solve()
+    try:
+        save(entries, path)
+    except OSError:
+        pass
+    return bytes(entries)
+
+
+def lookup(x_bits, o_bits):
+    """
+    Returns (cell, value) for the player to move: the best cell index,
+    or None if the game is over, and its value for that player.
+    Positions the book does not hold are searched directly.
+    """
+    global book
+    if book is None:
+        book = load()
+    entry = book[index(x_bits, o_bits)]
+    if entry == NO_MOVE:
+        return bitboard.best_move(x_bits, o_bits)
+    return entry >> 2, (entry & 3) - 1
+
+
+def main():
+    entries = solve()
+    save(entries)
+    solved = POSITIONS - entries.count(NO_MOVE)
+    print(f"Wrote {PATH}: {solved} positions with a move.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Monte Carlo Tree Search player for m,n,k games
+
+The tree is grown with UCT (UCB1 applied to trees). Each expanded leaf
+is scored by a batch of random playouts run together in NumPy: every
+game's remaining empty cells are filled in a random order at once, and
+the winner of each game is the player whose line was completed first.
+
+The tree below the chosen move is kept, so when the next call's
+position is a grandchild of the old root (our move, then the reply),
+search continues from that subtree.
+"""
+
+import math
+import time
+
+import numpy as np
+
+
+class Node():
+    def __init__(self, x_bits, o_bits, parent, move):
+        self.x_bits = x_bits
+        self.o_bits = o_bits
+        self.parent = parent
+        self.move = move
+        self.children = {}
+        self.untried = None
+
+        # Playouts run through this node, and the iterations (batches of
+        # playouts) that ran them
+        self.visits = 0
+        self.iterations = 0
+
+        # Playout score for the player who moved into this node: a win
+        # counts 1, a draw 0.5
+        self.score = 0.0
+
+
+class MCTS():
+
+    def __init__(self, game, batch=64, exploration=math.sqrt(2), seed=None):
+        self.game = game
+        self.batch = batch
+        self.exploration = exploration
+        self.rng = np.random.default_rng(seed)
+        self.root = None
+
+        # Cells of every line, for scoring playouts
+        self.lines = np.array([
+            [cell for cell in range(game.cells) if line >> cell & 1]
+            for line in game.lines
+        ], dtype=np.intp)
+
+    def x_to_move(self, node):
+        """Returns True if X is to move in a node's position."""
+        return bin(node.x_bits).count("1") == bin(node.o_bits).count("1")
+
+    def outcome(self, node):
+        """
+        Returns 1 if X has won in a node's position, -1 if O has, 0 for
+        a draw, or None if the game is not over.
+        """
+        game = self.game
+        if game.wins(node.x_bits):
+            return 1
+        if game.wins(node.o_bits):
+            return -1
+        if node.x_bits | node.o_bits == game.full:
+            return 0
+        return None
+
+    def best_move(self, x_bits, o_bits, iterations=None, budget=None):
+        """
+        Searches from the position for `iterations` tree expansions or
+        `budget` seconds, whichever ends first (one second if neither is
+        given). Returns (cell, score, iterations): the most visited move,
+        its average playout score for the player to move, and the number
+        of expansions made. cell is None if the game is over.
+        """
+        if iterations is None and budget is None:
+            budget = 1.0
+        root = self.reuse(x_bits, o_bits)
+        if self.outcome(root) is not None:
+            return None, 0.0, 0
+
+        deadline = None if budget is None else time.perf_counter() + budget
+        done = 0
+        while iterations is None or done < iterations:
+            # At least one expansion, so there is always a move to make
+            if (done and deadline is not None
+                    and time.perf_counter() > deadline):
+                break
+            self.iterate(root)
+            done += 1
+
+        child = max(root.children.values(), key=lambda node: node.visits)
+        self.root = child
+        return child.move, child.score / max(1, child.visits), done
+
+    def reuse(self, x_bits, o_bits):
+        """
+        Returns the node for a position, reusing the subtree from the
+        previous search if the position lies within two moves of it.
+        """
+        candidates = []
+        if self.root is not None:
+            candidates.append(self.root)
+            candidates.extend(self.root.children.values())
+        for node in candidates:
+            if node.x_bits == x_bits and node.o_bits == o_bits:
+                node.parent = None
+                self.root = node
+                return node
+        self.root = Node(x_bits, o_bits, None, None)
+        return self.root
+
+    def iterate(self, root):
+        """Runs one selection, expansion, playout and backup step."""
+        node = root
+        while node.untried is not None and not node.untried \
+                and node.children:
+            node = self.select(node)
+
+        result = self.outcome(node)
+        if result is None:
+            node = self.expand(node)
+            result = self.outcome(node)
+        if result is None:
+            x_wins, o_wins, draws = self.playout(node)
+        else:
+            x_wins = self.batch if result == 1 else 0
+            o_wins = self.batch if result == -1 else 0
+            draws = self.batch if result == 0 else 0
+
+        games = x_wins + o_wins + draws
+        while node is not None:
+            node.visits += games
+            node.iterations += 1
+            x_moved = not self.x_to_move(node)
+            node.score += (x_wins if x_moved else o_wins) + 0.5 * draws
+            node = node.parent
+
+    def select(self, node):
+        """
+        Returns the child with the highest UCB1 value. The exploration
+        term counts iterations rather than playouts, as in UCT with one
+        playout per iteration; counting whole batches would shrink it by
+        about the square root of the batch size.
+        """
+        log_iterations = math.log(node.iterations)
+        exploration = self.exploration
+        return max(
+            node.children.values(),
+            key=lambda child: child.score / child.visits
+            + exploration * math.sqrt(log_iterations / child.iterations)
+        )
+
+    def expand(self, node):
+        """Adds one untried child of a node and returns it."""
+        if node.untried is None:
+            empty = self.game.full & ~(node.x_bits | node.o_bits)
+            node.untried = [cell for cell in range(self.game.cells)
+                            if empty >> cell & 1]
+            self.rng.shuffle(node.untried)
+        cell = node.untried.pop()
+        if self.x_to_move(node):
+            child = Node(node.x_bits | 1 << cell, node.o_bits, node, cell)
+        else:
+            child = Node(node.x_bits, node.o_bits | 1 << cell, node, cell)
+        node.children[cell] = child
+        return child
+
+    def playout(self, node):
+        """
+        Plays `batch` random games to the end from a node's position and
+        returns (x_wins, o_wins, draws).
+        """
+        cells = self.game.cells
+        batch = self.batch
+        x_cells = np.array([node.x_bits >> c & 1 for c in range(cells)],
+                           dtype=bool)
+        o_cells = np.array([node.o_bits >> c & 1 for c in range(cells)],
+                           dtype=bool)
+        occupied = x_cells | o_cells
+
+        # Turn at which each cell is filled: a random order over the
+        # empty cells, negative for cells already taken
+        keys = self.rng.random((batch, cells))
+        keys[:, occupied] = -1.0
+        turn = np.argsort(np.argsort(keys, axis=1), axis=1)
+        turn -= int(occupied.sum())
+
+        # Owner of each cell: 0 for X, 1 for O
+        first = 0 if self.x_to_move(node) else 1
+        owner = (turn + first) % 2
+        owner[:, x_cells] = 0
+        owner[:, o_cells] = 1
+
+        # A line is won when its last cell is filled, if one player owns
+        # all of it; each game goes to the earliest such line
+        line_owner = owner[:, self.lines]
+        uniform = (line_owner == line_owner[:, :, :1]).all(axis=2)
+        finish = np.where(uniform, turn[:, self.lines].max(axis=2), cells)
+        earliest = finish.argmin(axis=1)
+        decided = finish[np.arange(batch), earliest] < cells
+        winner = line_owner[np.arange(batch), earliest, 0]
+
+        x_wins = int((decided & (winner == 0)).sum())
+        o_wins = int((decided & (winner == 1)).sum())
+        return x_wins, o_wins, batch - x_wins - o_wins
@@ -0,0 +1,329 @@
+"""
+m,n,k-game engine
+
+Tic Tac Toe generalised to a board of `rows` x `cols` where `k` in a
+row wins (Tic Tac Toe is 3,3,3; gomoku is 15,15,5). Each player's
+stones are one integer bitboard, with cell (i, j) at bit i * cols + j.
+
+Search is iterative-deepening negamax with alpha-beta pruning. Moves are
+ordered by the transposition table move, then killer moves, then the
+history heuristic. The transposition table is a fixed number of slots
+indexed by Zobrist hash, replacing an entry only with one searched at
+least as deep or from a newer search. Each call takes a wall-clock
+budget and returns the best move of the deepest finished iteration.
+"""
+
+import random
+import time
+
+# Scores: a win found at ply p is worth WIN - p, so quicker wins are
+# preferred; anything above MATE is a forced result, not a heuristic
+WIN = 1000000
+MATE = WIN - 10000
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Boards with more cells than this only consider moves next to stones
+NEAR_ONLY = 25
+
+
+class Timeout(Exception):
+    pass
+
+
+class Game():
+
+    def __init__(self, rows=3, cols=3, k=3):
+        if k > max(rows, cols):
+            raise ValueError("k cannot exceed the board size")
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.cells = rows * cols
+        self.full = (1 << self.cells) - 1
+
+        # Every window of k cells in a row, column or diagonal
+        self.lines = []
+        for i in range(rows):
+            for j in range(cols):
+                for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_i, end_j = i + di * (k - 1), j + dj * (k - 1)
+                    if 0 <= end_i < rows and 0 <= end_j < cols:
+                        self.lines.append(sum(
+                            1 << self.cell(i + di * s, j + dj * s)
+                            for s in range(k)
+                        ))
+        self.cell_lines = [
+            [line for line in self.lines if line >> cell & 1]
+            for cell in range(self.cells)
+        ]
+
+        # Cells within one step of each cell, for move generation
+        self.near = []
+        for i in range(rows):
+            for j in range(cols):
+                self.near.append(sum(
+                    1 << self.cell(a, b)
+                    for a in range(max(0, i - 1), min(rows, i + 2))
+                    for b in range(max(0, j - 1), min(cols, j + 2))
+                ))
+
+        # Heuristic value of a line holding only n stones of one player
+        self.weights = [0] + [4 ** n for n in range(1, k + 1)]
+
+        rng = random.Random(f"{rows}x{cols}:{k}")
+        self.zobrist = [[rng.getrandbits(64) for _ in range(self.cells)]
+                        for _ in range(2)]
+        self.side_key = rng.getrandbits(64)
+
+    def cell(self, i, j):
+        """Returns the bit index of cell (i, j)."""
+        return i * self.cols + j
+
+    def encode(self, board, x, o):
+        """
+        Returns the (x, o) bitboards of a list-of-lists board whose cells
+        hold `x`, `o` or anything else for empty.
+        """
+        x_bits = o_bits = 0
+        for i in range(self.rows):
+            for j in range(self.cols):
+                if board[i][j] == x:
+                    x_bits |= 1 << self.cell(i, j)
+                elif board[i][j] == o:
+                    o_bits |= 1 << self.cell(i, j)
+        return x_bits, o_bits
+
+    def wins(self, bits):
+        """Returns True if the stones in `bits` complete any line."""
+        return any(bits & line == line for line in self.lines)
+
+    def wins_through(self, bits, cell):
+        """Returns True if `bits` completes a line through `cell`."""
+        return any(bits & line == line for line in self.cell_lines[cell])
+
+    def hash(self, x_bits, o_bits):
+        """Returns the Zobrist hash of a position."""
+        key = 0
+        for side, bits in enumerate((x_bits, o_bits)):
+            cell = 0
+            while bits:
+                if bits & 1:
+                    key ^= self.zobrist[side][cell]
+                bits >>= 1
+                cell += 1
+        if bin(x_bits).count("1") != bin(o_bits).count("1"):
+            key ^= self.side_key
+        return key
+
+    def moves(self, me, them):
+        """
+        Returns the empty cells worth playing. On large boards this is
+        limited to cells next to a stone, or the centre if there are none.
+        """
+        occupied = me | them
+        candidates = self.full & ~occupied
+        if self.cells > NEAR_ONLY:
+            if not occupied:
+                return [self.cell(self.rows // 2, self.cols // 2)]
+            near = 0
+            bits, cell = occupied, 0
+            while bits:
+                if bits & 1:
+                    near |= self.near[cell]
+                bits >>= 1
+                cell += 1
+            candidates &= near
+        return [cell for cell in range(self.cells) if candidates >> cell & 1]
+
+    def evaluate(self, me, them):
+        """
+        Returns a heuristic score for the player holding `me`: lines
+        still open to one player count for them, more so the fuller.
+        """
+        score = 0
+        weights = self.weights
+        for line in self.lines:
+            mine, theirs = me & line, them & line
+            if mine and not theirs:
+                score += weights[bin(mine).count("1")]
+            elif theirs and not mine:
+                score -= weights[bin(theirs).count("1")]
+        return max(-MATE + 1, min(MATE - 1, score))
+
+
+class Search():
+
+    def __init__(self, game, capacity=1 << 18):
+        self.game = game
+        self.capacity = capacity
+        self.table = [None] * capacity
+        self.generation = 0
+        self.history = [0] * game.cells
+        self.killers = {}
+        self.nodes = 0
+        self.deadline = None
+
+    def best_move(self, x_bits, o_bits, budget=None, max_depth=None):
+        """
+        Searches the position for the player to move, deepening one ply
+        at a time until `budget` seconds have passed, `max_depth` plies
+        are done, or the result is decided. Returns (cell, value, depth)
+        from the deepest finished iteration; cell is None if the game is
+        already over.
+        """
+        game = self.game
+        if (game.wins(x_bits) or game.wins(o_bits)
+                or x_bits | o_bits == game.full):
+            return None, 0, 0
+        if bin(x_bits).count("1") == bin(o_bits).count("1"):
+            me, them, side = x_bits, o_bits, 0
+        else:
+            me, them, side = o_bits, x_bits, 1
+
+        self.generation += 1
+        self.killers = {}
+        self.nodes = 0
+        start = time.perf_counter()
+        key = game.hash(x_bits, o_bits)
+        empty = game.cells - bin(me | them).count("1")
+        limit = empty if max_depth is None else min(max_depth, empty)
+
+        best_cell, best_value, finished = None, 0, 0
+        for depth in range(1, limit + 1):
+            # The first iteration always finishes, so there is a move
+            if budget is not None and depth > 1:
+                self.deadline = start + budget
+            else:
+                self.deadline = None
+            try:
+                cell, value = self.root(me, them, side, key, depth, best_cell)
+            except Timeout:
+                break
+            best_cell, best_value, finished = cell, value, depth
+            if abs(value) >= MATE:
+                break
+        self.deadline = None
+        return best_cell, best_value, finished
+
+    def root(self, me, them, side, key, depth, previous):
+        """
+        Returns (cell, value) of the best move found at `depth`, trying
+        the previous iteration's best move first.
+        """
+        moves = self.order(self.game.moves(me, them), previous, 0)
+        alpha, beta = -WIN - 1, WIN + 1
+        best_cell = moves[0]
+        for cell in moves:
+            value = self.child(me, them, side, key, cell, depth, 0,
+                               -beta, -alpha)
+            if value > alpha:
+                alpha, best_cell = value, cell
+        return best_cell, alpha
+
+    def child(self, me, them, side, key, cell, depth, ply, alpha, beta):
+        """
+        Returns the value for the mover of playing `cell`, given the
+        child's window (-beta, -alpha) as seen by the opponent.
+        """
+        game = self.game
+        mine = me | 1 << cell
+        if game.wins_through(mine, cell):
+            return WIN - ply - 1
+        child_key = key ^ game.zobrist[side][cell] ^ game.side_key
+        return -self.negamax(them, mine, 1 - side, child_key,
+                             depth - 1, ply + 1, alpha, beta)
+
+    def order(self, moves, first, ply):
+        """
+        Orders moves: `first` (the table move), then killers at this
+        ply, then the rest by history score.
+        """
+        history = self.history
+        moves.sort(key=history.__getitem__, reverse=True)
+        front = [first] + self.killers.get(ply, [])
+        for cell in reversed(front):
+            if cell in moves:
+                moves.remove(cell)
+                moves.insert(0, cell)
+        return moves
+
+    def negamax(self, me, them, side, key, depth, ply, alpha, beta):
+        """
+        Returns the value of a position for the player to move, who holds
+        `me`, searched `depth` more plies within the window alpha..beta.
+        """
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes & 255:
+            if time.perf_counter() > self.deadline:
+                raise Timeout
+
+        game = self.game
+        if me | them == game.full:
+            return 0
+        if depth == 0:
+            return game.evaluate(me, them)
+
+        slot = key % self.capacity
+        entry = self.table[slot]
+        table_move = None
+        if entry is not None and entry[0] == key:
+            _, entry_depth, stored, bound, table_move, _ = entry
+            value = from_table(stored, ply)
+            if entry_depth >= depth:
+                if bound == EXACT:
+                    return value
+                if bound == LOWER and value >= beta:
+                    return value
+                if bound == UPPER and value <= alpha:
+                    return value
+
+        original = alpha
+        best, best_cell = -WIN - 1, None
+        for cell in self.order(game.moves(me, them), table_move, ply):
+            value = self.child(me, them, side, key, cell, depth, ply,
+                               -beta, -alpha)
+            if value > best:
+                best, best_cell = value, cell
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        killers = self.killers.setdefault(ply, [])
+                        if cell not in killers:
+                            killers.insert(0, cell)
+                            del killers[2:]
+                        self.history[cell] += depth * depth
+                        break
+
+        if best <= original:
+            bound = UPPER
+        elif best >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+
+        # Keep the deeper entry unless the stored one is from an
+        # earlier search
+        if (entry is None or entry[0] == key or entry[1] <= depth
+                or entry[5] != self.generation):
+            self.table[slot] = (key, depth, to_table(best, ply), bound,
+                                best_cell, self.generation)
+        return best
+
+
+def to_table(value, ply):
+    """Stores forced results relative to the node, not the root."""
+    if value >= MATE:
+        return value + ply
+    if value <= -MATE:
+        return value - ply
+    return value
+
+
+def from_table(value, ply):
+    """Inverts `to_table` for a node at `ply`."""
+    if value >= MATE:
+        return value - ply
+    if value <= -MATE:
+        return value + ply
+    return value
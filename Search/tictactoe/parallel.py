@@ -0,0 +1,195 @@
+"""
+Parallel root-split search for m,n,k games
+
+Each iteration of the deepening loop searches the first root move on
+its own (the "eldest brother", as in Young Brothers Wait) to establish a
+bound, then searches all the remaining root moves at once across a
+process pool. Workers share the best root score so far through one
+shared integer, so a move searched later starts with a narrower window.
+
+Usage: python parallel.py [rows cols k depth]
+Benchmarks nodes per second for 1, 2, 4, ... workers up to the number
+of cores, searching an opening position to a fixed depth.
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import mnk
+
+# Per-process state, set up by `start_worker`
+search = None
+shared_alpha = None
+
+
+def start_worker(rows, cols, k, alpha):
+    """Gives a worker process its own search and the shared bound."""
+    global search, shared_alpha
+    search = mnk.Search(mnk.Game(rows, cols, k))
+    shared_alpha = alpha
+
+
+def search_move(me, them, side, key, cell, depth, deadline):
+    """
+    Searches root move `cell` to `depth` in a worker. Returns (cell,
+    value, exact, nodes); value is None if the deadline (a time.time()
+    value, or None) passed first, and exact is False when the value is
+    only an upper bound because it did not beat the shared bound.
+    """
+    search.nodes = 0
+    search.killers = {}
+    if deadline is None:
+        search.deadline = None
+    else:
+        search.deadline = time.perf_counter() + deadline - time.time()
+
+    alpha = shared_alpha.value
+    try:
+        value = search.child(me, them, side, key, cell, depth, 0,
+                             -mnk.WIN - 1, -alpha)
+    except mnk.Timeout:
+        return cell, None, False, search.nodes
+    finally:
+        search.deadline = None
+
+    exact = value > alpha
+    if exact:
+        with shared_alpha.get_lock():
+            if value > shared_alpha.value:
+                shared_alpha.value = value
+    return cell, value, exact, search.nodes
+
+
+class ParallelSearch():
+
+    def __init__(self, game, workers):
+        self.game = game
+        self.workers = workers
+        self.nodes = 0
+        self.alpha = multiprocessing.Value("q", 0)
+        self.executor = ProcessPoolExecutor(
+            workers, initializer=start_worker,
+            initargs=(game.rows, game.cols, game.k, self.alpha)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Stops the worker processes."""
+        self.executor.shutdown(cancel_futures=True)
+
+    def best_move(self, x_bits, o_bits, budget=None, max_depth=None):
+        """
+        Like `mnk.Search.best_move`: returns (cell, value, depth) from the
+        deepest iteration finished within `budget` seconds. The nodes
+        searched by all workers are left in self.nodes.
+        """
+        game = self.game
+        if (game.wins(x_bits) or game.wins(o_bits)
+                or x_bits | o_bits == game.full):
+            return None, 0, 0
+        if bin(x_bits).count("1") == bin(o_bits).count("1"):
+            me, them, side = x_bits, o_bits, 0
+        else:
+            me, them, side = o_bits, x_bits, 1
+
+        self.nodes = 0
+        start = time.time()
+        key = game.hash(x_bits, o_bits)
+        empty = game.cells - bin(me | them).count("1")
+        limit = empty if max_depth is None else min(max_depth, empty)
+
+        # Root moves are reordered by their score in the last iteration
+        moves = game.moves(me, them)
+        scores = {}
+
+        best_cell, best_value, finished = None, 0, 0
+        for depth in range(1, limit + 1):
+            if budget is not None and depth > 1:
+                deadline = start + budget
+            else:
+                deadline = None
+            moves.sort(key=lambda cell: scores.get(cell, 0), reverse=True)
+            results = self.iteration(me, them, side, key, moves, depth,
+                                     deadline)
+            if results is None:
+                break
+            scores = {cell: value for cell, value, _ in results}
+            best_value, _, best_cell = max(
+                (value, exact, cell) for cell, value, exact in results
+            )
+            finished = depth
+            if abs(best_value) >= mnk.MATE:
+                break
+        return best_cell, best_value, finished
+
+    def iteration(self, me, them, side, key, moves, depth, deadline):
+        """
+        Searches every root move to `depth`, eldest first. Returns a list
+        of (cell, value, exact), or None if the deadline passed.
+        """
+        self.alpha.value = -mnk.WIN - 1
+
+        def submit(cell):
+            return self.executor.submit(search_move, me, them, side, key,
+                                        cell, depth, deadline)
+
+        cell, value, exact, nodes = submit(moves[0]).result()
+        self.nodes += nodes
+        if value is None:
+            return None
+
+        results = [(cell, value, exact)]
+        timed_out = False
+        for future in [submit(cell) for cell in moves[1:]]:
+            cell, value, exact, nodes = future.result()
+            self.nodes += nodes
+            if value is None:
+                timed_out = True
+            results.append((cell, value, exact))
+        if timed_out:
+            return None
+        return results
+
+
+def main():
+    if len(sys.argv) not in (1, 5):
+        sys.exit("Usage: python parallel.py [rows cols k depth]")
+    if len(sys.argv) == 5:
+        rows, cols, k, depth = (int(arg) for arg in sys.argv[1:])
+    else:
+        rows, cols, k, depth = 4, 4, 4, 7
+    game = mnk.Game(rows, cols, k)
+
+    # A fresh position with two stones, so the root has many moves
+    x_bits = 1 << game.cell(rows // 2, cols // 2)
+    o_bits = 1 << game.cell(rows // 2 - 1, cols // 2)
+
+    counts = []
+    workers = 1
+    while workers < (os.cpu_count() or 1):
+        counts.append(workers)
+        workers *= 2
+    counts.append(os.cpu_count() or 1)
+
+    print(f"{rows}x{cols}, {k} in a row, depth {depth}")
+    print("workers  seconds      nodes  nodes/sec  move")
+    for workers in counts:
+        with ParallelSearch(game, workers) as parallel:
+            started = time.perf_counter()
+            cell, _, _ = parallel.best_move(x_bits, o_bits, max_depth=depth)
+            elapsed = time.perf_counter() - started
+            rate = parallel.nodes / elapsed
+            print(f"{workers:7}  {elapsed:7.2f}  {parallel.nodes:9}  "
+                  f"{rate:9.0f}  {divmod(cell, cols)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,12 @@ import time
 
 import tictactoe as ttt
 
+# The AI plays perfect minimax, or Monte Carlo Tree Search with "mcts"
+if len(sys.argv) > 2 or (len(sys.argv) == 2
+                         and sys.argv[1] not in ("minimax", "mcts")):
+    sys.exit("Usage: python runner.py [minimax|mcts]")
+engine = sys.argv[1] if len(sys.argv) == 2 else "minimax"
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -112,7 +118,10 @@ while True:
         if user != player and not game_over:
             if ai_turn:
                 time.sleep(0.5)
-                move = ttt.minimax(board)
+                if engine == "mcts":
+                    move = ttt.monte_carlo(board)
+                else:
+                    move = ttt.minimax(board)
                 board = ttt.result(board, move)
                 ai_turn = False
             else:
@@ -2,171 +2,175 @@
 Tic Tac Toe Player
 """
 
-import math
-import copy
+import bitboard
+import book
+import mcts
+import mnk
+import parallel
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Seconds per move for boards other than 3x3, which are not solved exactly
+BUDGET = 1.0
 
-def initial_state():
+# m,n,k games by (rows, cols, k), shared by the searches and winner()
+games = {}
+
+# m,n,k searches by (rows, cols, k, workers), kept so their tables
+# and worker processes persist between moves
+searches = {}
+
+# Monte Carlo players by (rows, cols, k), kept so their trees persist
+players = {}
+
+
+def initial_state(rows=3, cols=3):
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * cols for _ in range(rows)]
+
+
+def game_for(board, k):
+    """Returns the m,n,k game for a board's shape with k in a row."""
+    shape = (len(board), len(board[0]), k)
+    if shape not in games:
+        games[shape] = mnk.Game(*shape)
+    return games[shape]
+
+
+def search_for(board, k, workers=1):
+    """
+    Returns the m,n,k search for a board other than 3x3 with k in a row,
+    running on `workers` processes if more than one.
+    """
+    shape = (len(board), len(board[0]), k)
+    if (*shape, workers) not in searches:
+        game = game_for(board, k)
+        if workers > 1:
+            searches[(*shape, workers)] = parallel.ParallelSearch(game, workers)
+        else:
+            searches[(*shape, workers)] = mnk.Search(game)
+    return searches[(*shape, workers)]
+
+
+def classic(board, k):
+    """Returns True for the 3x3, three-in-a-row game."""
+    return k == 3 and len(board) == 3 and len(board[0]) == 3
 
 
 def player(board):
     """
     Returns player who has the next turn on a board.
     """
-    c1 = int(0)
-    c2 = int(0)
-    for L in board:
-        for R in L:
-            if R == X:c1 += 1
-            if R == O:c2 += 1
-    # print(c1,c2)
-    if(c1 ^ c2 == 0):return X
-    else:return O
-    raise NotImplementedError
+    x_count = sum(row.count(X) for row in board)
+    o_count = sum(row.count(O) for row in board)
+    return X if x_count == o_count else O
 
 
 def actions(board):
     """
     Returns set of all possible actions (i, j) available on the board.
     """
-    ans = set()
-    for x in range(0,3):
-        for y in range(0,3):
-            # print(board[x][y],end=' ')
-            if(board[x][y] == EMPTY):ans.add((x,y))
-        # print("")
-    return ans
-    raise NotImplementedError
+    return {(i, j)
+            for i, row in enumerate(board)
+            for j, cell in enumerate(row)
+            if cell == EMPTY}
 
 
 def result(board, action):
     """
     Returns the board that results from making move (i, j) on the board.
     """
-    x,y = action[0],action[1]
-    C = player(board)
-    ans = copy.deepcopy(board)
-    if(ans[x][y] != EMPTY):raise ValueError
-    ans[x][y] = C
+    i, j = action
+    if board[i][j] != EMPTY:
+        raise ValueError
+    ans = [row[:] for row in board]
+    ans[i][j] = player(board)
     return ans
-    raise NotImplementedError
 
 
-def winner(board):
+def winner(board, k=3):
     """
     Returns the winner of the game, if there is one.
     """
-    if(board[0][0] == board[0][1] and board[0][1] == board[0][2] and (not board[0][0] == EMPTY)):return board[0][0]
-    if(board[0][0] == board[1][0] and board[1][0] == board[2][0] and (not board[0][0] == EMPTY)):return board[0][0]
-    if(board[0][0] == board[1][1] and board[1][1] == board[2][2] and (not board[0][0] == EMPTY)):return board[0][0]
-    if(board[0][1] == board[1][1] and board[1][1] == board[2][1] and (not board[0][1] == EMPTY)):return board[0][1]
-    if(board[0][2] == board[1][2] and board[1][2] == board[2][2] and (not board[0][2] == EMPTY)):return board[0][2]
-    if(board[0][2] == board[1][1] and board[1][1] == board[2][0] and (not board[0][2] == EMPTY)):return board[0][2]
-    if(board[1][0] == board[1][1] and board[1][1] == board[1][2] and (not board[1][0] == EMPTY)):return board[1][0]
-    if(board[2][0] == board[2][1] and board[2][1] == board[2][2] and (not board[2][0] == EMPTY)):return board[2][0]
+    if classic(board, k):
+        x_bits, o_bits = bitboard.encode(board, X, O)
+        wins = bitboard.WINS.__getitem__
+    else:
+        game = game_for(board, k)
+        x_bits, o_bits = game.encode(board, X, O)
+        wins = game.wins
+    if wins(x_bits):
+        return X
+    if wins(o_bits):
+        return O
     return None
-    raise NotImplementedError
 
 
-def terminal(board):
+def terminal(board, k=3):
     """
     Returns True if game is over, False otherwise.
     """
-    p = bool(1);
-    for i in range(0,3):
-        for j in range(0,3):
-            p = p and (not board[i][j] == EMPTY)
-    if p : return True
-    if(not (winner(board) == None)):return True
-    else:return False
-    raise NotImplementedError
+    if winner(board, k) is not None:
+        return True
+    return all(cell != EMPTY for row in board for cell in row)
 
 
-def utility(board):
+def utility(board, k=3):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    if(winner(board) == X):return 1
-    if(winner(board) == O):return -1
+    won = winner(board, k)
+    if won == X:
+        return 1
+    if won == O:
+        return -1
     return 0
-    raise NotImplementedError
-
-val = {}
 
-def findkey(board):
-    key = ""
-    for x in range(0,3):
-        for y in range(0,3):
-           if(board[x][y] == X):key += "X"
-           if(board[x][y] == O):key += "O"
-           if(board[x][y] == EMPTY):key += "E" 
-    return key    
 
-def minimax(board):
+def minimax(board, k=3, budget=None, workers=1):
     """
     Returns the optimal action for the current player on the board.
-    """
-    # print("START")
-    # print(board)
-    if(terminal(board)):
-        val[findkey(board)] = utility(board)
-        return None
-    # print("AND")
-    now = player(board)
-    ans = (-1,-1)
-    k = int(0)
-    # for max
-    S = actions(board)
-    if now == X:
-        k = int(-2)
-        for s in S:
-            # if(not findkey(result(board,s)) in val):raise ValueError
-            # print("CHANGE ",s)
-            si = minimax(result(board,s))
-            # si = result(board,s)
-            # print("RETURN ",board)
-            ST = findkey(result(board,s))
-            if(val[ST] > k):
-                k = val[ST]
-                ans = s
-                if(k == 1):break
-    if now == O:
-        k = int(2)
-        for s in S:
-            # print("CHANGE ",s)
-            si = minimax(result(board,s))
-            ST = findkey(result(board,s))
-            if(val[ST] < k):   
-                k = val[ST]
-                ans = s
-                if(k == -1):break
-    val[findkey(board)] = k
-    # print(board)
-    # print("END")
-    return ans
-    raise NotImplementedError
 
-# SS = result([[X, EMPTY, EMPTY],
-#             [EMPTY, X, EMPTY],
-#             [EMPTY, EMPTY, X]],(0,1))
-
-# print(terminal([[O, X, EMPTY],
-#             [EMPTY, X, O],
-#             [EMPTY, X, EMPTY]]))
+    The 3x3 game is answered exactly from the opening book. Other board
+    sizes, with k in a row to win, are searched for `budget` seconds
+    (BUDGET by default) and return the best move found in that time,
+    splitting the root moves over `workers` processes if more than one.
+    """
+    if classic(board, k):
+        cell, _ = book.lookup(*bitboard.encode(board, X, O))
+        cols = 3
+    else:
+        search = search_for(board, k, workers)
+        game = search.game
+        cell, _, _ = search.best_move(
+            *game.encode(board, X, O),
+            budget=BUDGET if budget is None else budget
+        )
+        cols = game.cols
+    if cell is None:
+        return None
+    return divmod(cell, cols)
 
-# print(result([[X, EMPTY, EMPTY],
-#             [EMPTY, EMPTY, EMPTY],
-#             [EMPTY, EMPTY, EMPTY]],(0,1)))
 
-# print(SS = actions([['O', 'X', None], [None, None, 'O'], [None, 'X', None]]))
-# result([['O', 'X', None], [None, None, 'O'], [None, 'X', None]],)
\ No newline at end of file
+def monte_carlo(board, k=3, budget=None, iterations=None):
+    """
+    Returns an action for the current player chosen by Monte Carlo Tree
+    Search, running for `budget` seconds (BUDGET by default) or for
+    `iterations` tree expansions. Unlike minimax, it is not guaranteed
+    to be optimal, but its time per move does not grow with board size.
+    """
+    shape = (len(board), len(board[0]), k)
+    if shape not in players:
+        players[shape] = mcts.MCTS(game_for(board, k))
+    searcher = players[shape]
+    if budget is None and iterations is None:
+        budget = BUDGET
+    cell, _, _ = searcher.best_move(*searcher.game.encode(board, X, O),
+                                    iterations=iterations, budget=budget)
+    if cell is None:
+        return None
+    return divmod(cell, searcher.game.cols)
@@ -0,0 +1,222 @@
+"""
+Headless Tic Tac Toe tournament
+
+Plays games between two engines without pygame, alternating who plays
+X, with games spread over worker processes. Prints a JSON report with
+the win/draw/loss table, nodes searched, move latency percentiles and
+peak memory of the worker processes.
+
+Usage: python tournament.py [options] engine engine
+Engines: random, minimax, search, mcts
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak memory is then not reported
+    resource = None
+
+import mcts
+import mnk
+import tictactoe as ttt
+
+
+class RandomEngine():
+    """Plays a uniformly random legal move."""
+
+    def __init__(self, game, budget, seed):
+        self.rng = random.Random(seed)
+
+    def move(self, board, k):
+        return self.rng.choice(sorted(ttt.actions(board))), 0
+
+
+class MinimaxEngine():
+    """Plays `tictactoe.minimax`: the book on 3x3, m,n,k search otherwise."""
+
+    def __init__(self, game, budget, seed):
+        self.budget = budget
+
+    def move(self, board, k):
+        action = ttt.minimax(board, k, self.budget)
+        if ttt.classic(board, k):
+            return action, 0
+        return action, ttt.search_for(board, k).nodes
+
+
+class SearchEngine():
+    """Plays the m,n,k iterative-deepening search, even on 3x3."""
+
+    def __init__(self, game, budget, seed):
+        self.game = game
+        self.search = mnk.Search(game)
+        self.budget = budget
+
+    def move(self, board, k):
+        cell, _, _ = self.search.best_move(*self.game.encode(board, ttt.X,
+                                                             ttt.O),
+                                           budget=self.budget)
+        return divmod(cell, self.game.cols), self.search.nodes
+
+
+class MCTSEngine():
+    """Plays Monte Carlo Tree Search; nodes counts random playouts."""
+
+    def __init__(self, game, budget, seed):
+        self.game = game
+        self.mcts = mcts.MCTS(game, seed=seed)
+        self.budget = budget
+
+    def move(self, board, k):
+        cell, _, iterations = self.mcts.best_move(
+            *self.game.encode(board, ttt.X, ttt.O), budget=self.budget
+        )
+        return divmod(cell, self.game.cols), iterations * self.mcts.batch
+
+
+ENGINES = {
+    "random": RandomEngine,
+    "minimax": MinimaxEngine,
+    "search": SearchEngine,
+    "mcts": MCTSEngine
+}
+
+
+def play(names, rows, cols, k, budget, seed):
+    """
+    Plays one game, names[0] as X and names[1] as O. Returns the winner
+    (0, 1 or None for a draw) and per-engine move latencies and nodes.
+    """
+    game = mnk.Game(rows, cols, k)
+    engines = [ENGINES[name](game, budget, seed * 2 + i)
+               for i, name in enumerate(names)]
+    latencies = ([], [])
+    nodes = [0, 0]
+
+    board = ttt.initial_state(rows, cols)
+    while not ttt.terminal(board, k):
+        side = 0 if ttt.player(board) == ttt.X else 1
+        start = time.perf_counter()
+        action, searched = engines[side].move(board, k)
+        latencies[side].append(time.perf_counter() - start)
+        nodes[side] += searched
+        board = ttt.result(board, action)
+
+    won = ttt.winner(board, k)
+    winner = None if won is None else (0 if won == ttt.X else 1)
+    peak = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return winner, latencies, nodes, peak
+
+
+def percentiles(values):
+    """Returns the p50, p90, p99 and max of a list, in milliseconds."""
+    values = sorted(values)
+    if not values:
+        return {}
+
+    def at(fraction):
+        return 1000 * values[min(len(values) - 1, int(fraction * len(values)))]
+
+    return {"p50_ms": at(0.50), "p90_ms": at(0.90), "p99_ms": at(0.99),
+            "max_ms": 1000 * values[-1]}
+
+
+def run(first, second, games, rows, cols, k, budget, workers, seed):
+    """
+    Plays `games` games between two engines, swapping colours each game,
+    and returns the report as a dict.
+    """
+    # Game i has engine i % 2 as X
+    jobs = []
+    for i in range(games):
+        names = (first, second) if i % 2 == 0 else (second, first)
+        jobs.append((names, rows, cols, k, budget, seed + i))
+
+    start = time.perf_counter()
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(play, *zip(*jobs)))
+    else:
+        results = [play(*job) for job in jobs]
+    elapsed = time.perf_counter() - start
+
+    stats = {}
+    for label in ("first", "second"):
+        stats[label] = {"win": 0, "draw": 0, "loss": 0,
+                        "win_as_x": 0, "win_as_o": 0,
+                        "nodes": 0, "latencies": []}
+    peak = None
+    for i, (winner, latencies, nodes, memory) in enumerate(results):
+        labels = ("first", "second") if i % 2 == 0 else ("second", "first")
+        for side, label in enumerate(labels):
+            entry = stats[label]
+            if winner is None:
+                entry["draw"] += 1
+            elif winner == side:
+                entry["win"] += 1
+                entry["win_as_x" if side == 0 else "win_as_o"] += 1
+            else:
+                entry["loss"] += 1
+            entry["nodes"] += nodes[side]
+            entry["latencies"].extend(latencies[side])
+        if memory is not None:
+            peak = memory if peak is None else max(peak, memory)
+
+    engines = {}
+    for label, name in (("first", first), ("second", second)):
+        entry = stats[label]
+        moves = len(entry["latencies"])
+        thinking = sum(entry["latencies"])
+        engines[f"{label}:{name}"] = {
+            "win": entry["win"], "draw": entry["draw"],
+            "loss": entry["loss"], "win_as_x": entry["win_as_x"],
+            "win_as_o": entry["win_as_o"], "moves": moves,
+            "nodes": entry["nodes"],
+            "nodes_per_second": entry["nodes"] / thinking if thinking else 0,
+            "latency": percentiles(entry["latencies"])
+        }
+
+    return {
+        "board": {"rows": rows, "cols": cols, "k": k},
+        "games": games,
+        "budget": budget,
+        "workers": workers,
+        "seconds": elapsed,
+        "peak_memory_kb": peak,
+        "engines": engines
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("engines", nargs=2, choices=sorted(ENGINES))
+    parser.add_argument("-n", "--games", type=int, default=100)
+    parser.add_argument("--rows", type=int, default=3)
+    parser.add_argument("--cols", type=int, default=3)
+    parser.add_argument("-k", type=int, default=3,
+                        help="stones in a row needed to win")
+    parser.add_argument("-b", "--budget", type=float, default=0.1,
+                        help="seconds per move for searching engines")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes")
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = run(*args.engines, args.games, args.rows, args.cols, args.k,
+                 args.budget, max(1, args.workers), args.seed)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()